@@ -40,11 +40,13 @@
 # THE SOFTWARE.
 #
 
+import os
 import time
 from ustruct import unpack, unpack_from
 from array import array
 from math import exp, log
 from i2c_core import *
+from measure_record import MeasureRecord
 
 # BME280 default address.
 BME280_I2CADDR = 0x76
@@ -57,6 +59,7 @@ BME280_OSAMPLE_8 = 4
 BME280_OSAMPLE_16 = 5
 
 BME280_REGISTER_CALIB_0 = 0x88
+BME280_REGISTER_CHIPID = 0xD0
 BME280_REGISTER_CALIB_26 = 0xE1
 BME280_REGISTER_CONTROL_HUM = 0xF2
 BME280_REGISTER_STATUS = 0xF3
@@ -71,23 +74,103 @@ MODE_SLEEP = const(0)
 MODE_FORCED = const(1)
 MODE_NORMAL = const(3)
 
-BME280_TIMEOUT = const(100)  # about 1 second timeout
+# Standby time between conversions in normal mode (t_sb)
+BME280_STANDBY_0_5 = const(0)   # 0.5 ms
+BME280_STANDBY_62_5 = const(1)  # 62.5 ms
+BME280_STANDBY_125 = const(2)   # 125 ms
+BME280_STANDBY_250 = const(3)   # 250 ms
+BME280_STANDBY_500 = const(4)   # 500 ms
+BME280_STANDBY_1000 = const(5)  # 1000 ms
+BME280_STANDBY_10 = const(6)    # 10 ms
+BME280_STANDBY_20 = const(7)    # 20 ms
+
+# IIR filter coefficient
+BME280_FILTER_OFF = const(0)
+BME280_FILTER_2 = const(1)
+BME280_FILTER_4 = const(2)
+BME280_FILTER_8 = const(3)
+BME280_FILTER_16 = const(4)
+
+BME280_TIMEOUT = const(100)  # status polls of 1 ms after the conversion time, about 100 ms
+
+# Compensation engines
+BME280_COMP_FLOAT = const(0)  # float math, results in °C, Pa, %
+BME280_COMP_INT = const(1)    # integer math, results in 0.01°C, Pa×256, %RH×1024
+
+# Measures: key, unit, english and german label
+BME280_MEASURES = (
+    ("temp", "°C", "Temperature", "Temperatur"),
+    ("pres", "hPa", "Pressure", "Luftdruck"),
+    ("humi", "%", "Humidity", "Luftfeuchte"),
+    ("dewp", "°C", "Dew Point", "Taupunkt"),
+    ("dens", "kg/m³", "Density", "Luftdichte"))
+_TEMP = const(0)
+_PRES = const(1)
+_HUMI = const(2)
+_DEWP = const(3)
+_DENS = const(4)
+
+# derived quantities valid for the current sample, see _derived
+_HAVE_E_S = const(1)
+_HAVE_DEWP = const(2)
+_HAVE_DENS = const(4)
+_HAVE_QNH = const(8)
+
+
+def read_cal_cache(filename, key):
+    """ Calibration NVM content stored by write_cal_cache.
+
+        Returns:
+            33 bytes (0x88..0xA1, 0xE1..0xE7) or None if there are none
+            for key or the entry is damaged
+    """
+    try:
+        with open(filename) as f:
+            for line in f:
+                k, _, nvm = line.strip().partition(" ")
+                if k == key:
+                    nvm = bytes.fromhex(nvm)
+                    return nvm if len(nvm) == 33 else None
+    except (OSError, ValueError):
+        # no file yet, or e.g. a line cut short by a power loss
+        pass
+    return None
+
+def write_cal_cache(filename, key, nvm):
+    """ Stores the calibration NVM content of one sensor in filename,
+        one line "key hex" per sensor. The file is replaced as a whole,
+        so a power loss leaves either the old or the new one.
+    """
+    lines = []
+    try:
+        with open(filename) as f:
+            for line in f:
+                if line.partition(" ")[0] != key:
+                    lines.append(line)
+    except OSError:
+        pass
+    lines.append("{} {}\n".format(key, bytes(nvm).hex()))
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as f:
+        for line in lines:
+            f.write(line)
+    os.rename(tmp, filename)
+
 
 class BME280(I2CDEV):
     # creates variables
-    measures = {\
-        "temp" : [0.0, "°C", "Temperature", "Temperatur"],\
-        "pres" : [0.0, "hPa", "Pressure", "Luftdruck"],\
-        "humi" : [0.0, "%", "Humidity", "Luftfeuchte"],\
-        "dewp" : [0.0, "°C", "Dew Point", "Taupunkt"],\
-        "dens" : [0.0, "kg/m³", "Density", "Luftdichte"]}
     measuresValid = False
+    history = None  # optional history.History
+    # keys of measures, in record order
+    MEASURE_KEYS = tuple(m[0] for m in BME280_MEASURES)
  
     def __init__(self,
                  mode=BME280_OSAMPLE_8,
                  address=BME280_I2CADDR,
                  i2c=None,
                  altitude=0,
+                 compensation=BME280_COMP_FLOAT,
+                 cal_cache=None,
                  **kwargs):
         # Check that mode is valid.
         if type(mode) is tuple and len(mode) == 3:
@@ -105,20 +188,132 @@ class BME280(I2CDEV):
                     'BME280_OSAMPLE_1, BME280_OSAMPLE_2, BME280_OSAMPLE_4, '
                     'BME280_OSAMPLE_8 or BME280_OSAMPLE_16'.format(mode))
 
+        if compensation not in (BME280_COMP_FLOAT, BME280_COMP_INT):
+            raise ValueError(
+                'Unexpected compensation value {0}. Set compensation to '
+                'BME280_COMP_FLOAT or BME280_COMP_INT'.format(compensation))
+        self.compensation = compensation
+        self._t_measure_us = 1250 + 2300 * (1 << (self._mode_temp - 1)) \
+            + 2300 * (1 << (self._mode_press - 1)) + 575 \
+            + 2300 * (1 << (self._mode_hum - 1)) + 575
+        self._deadline = None
+
         self.address = address
         if i2c is None:
             raise ValueError('An I2C object is required.')
         self.i2c = i2c
         self.__altitude = altitude
+        self.record = MeasureRecord(BME280_MEASURES)
+        # file with the calibration of the sensors, skips the NVM read
+        self.cal_cache = cal_cache
+        self._coef = None
+        # derived quantities are computed on first access after a sample
+        self._derived = 0
+        self._magnus = 0.0
+        self._e_s = 0.0
+        self._qnh = 0.0
         super().__init__(bus=i2c, dev_id=address, probe_on_bus=True)
         
     def start_measurement(self):
-        # load calibration data
-        dig_88_a1 = bytearray(26)
-        self.read_mem_into(BME280_REGISTER_CALIB_0, memoryview(dig_88_a1))
-        dig_e1_e7 = bytearray(7)
-        self.read_mem_into(BME280_REGISTER_CALIB_26, memoryview(dig_e1_e7))
+        # calibration data, read once
+        if self._coef is None:
+            self.load_calibration()
+
+        # temporary data holders which stay allocated
+        self._l1_barray = bytearray(1)
+        self._l8_barray = bytearray(8)
+        self._l3_resultarray = array("i", [0, 0, 0])
+        self._l3_intresult = array("i", [0, 0, 0])
+
+        self._l1_barray[0] = self._mode_temp << 5 | self._mode_press << 2 | MODE_SLEEP
+        self.write_mem(BME280_REGISTER_CONTROL,
+                             self._l1_barray)
+        self._op_mode = MODE_FORCED
+        self.t_fine = 0
+        return
+
+    def start_continuous(self, standby=BME280_STANDBY_62_5,
+                         iir_filter=BME280_FILTER_OFF):
+        """ Switches the sensor to normal mode, where it converts
+            continuously. read_raw_data then only does the burst readout.
+            start_measurement must have been called before.
+
+            Args:
+                standby: BME280_STANDBY_xxx, inactive time between conversions
+                iir_filter: BME280_FILTER_xxx, IIR filter coefficient
+        """
+        if standby not in range(8):
+            raise ValueError('Unexpected standby value {0}'.format(standby))
+        if iir_filter not in range(5):
+            raise ValueError('Unexpected iir_filter value {0}'.format(iir_filter))
+        # the config register is only written reliably in sleep mode
+        self._l1_barray[0] = self._mode_temp << 5 | self._mode_press << 2 | MODE_SLEEP
+        self.write_mem(BME280_REGISTER_CONTROL, self._l1_barray)
+        self._l1_barray[0] = standby << 5 | iir_filter << 2
+        self.write_mem(BME280_REGISTER_CONFIG, self._l1_barray)
+        # control_hum takes effect with the following write of control
+        self._l1_barray[0] = self._mode_hum
+        self.write_mem(BME280_REGISTER_CONTROL_HUM, self._l1_barray)
+        self._l1_barray[0] = self._mode_temp << 5 | self._mode_press << 2 | MODE_NORMAL
+        self.write_mem(BME280_REGISTER_CONTROL, self._l1_barray)
+        self._op_mode = MODE_NORMAL
+        return
+
+    def stop_continuous(self):
+        """ Puts the sensor back to sleep, read_raw_data uses forced mode
+            again.
+        """
+        self._l1_barray[0] = self._mode_temp << 5 | self._mode_press << 2 | MODE_SLEEP
+        self.write_mem(BME280_REGISTER_CONTROL, self._l1_barray)
+        self._op_mode = MODE_FORCED
+        return
 
+    def load_calibration(self):
+        """ Reads the calibration NVM, or takes it from the cal_cache file
+            if it holds an entry for the same place on the bus and chip ID.
+            A sensor swapped for another one of the same type at the same
+            place needs the entry removed from the file.
+        """
+        key = None
+        nvm = None
+        if self.cal_cache is not None:
+            key = self.calibration_key()
+            nvm = read_cal_cache(self.cal_cache, key)
+        if nvm is None:
+            nvm = bytearray(33)
+            nvm_mv = memoryview(nvm)
+            # both blocks in one transfer
+            self.batch().read_mem(BME280_REGISTER_CALIB_0, nvm_mv[0:26]) \
+                .read_mem(BME280_REGISTER_CALIB_26, nvm_mv[26:33]).run()
+            if key is not None:
+                write_cal_cache(self.cal_cache, key, nvm)
+        self.set_calibration(nvm[0:26], nvm[26:33])
+
+    def calibration_key(self):
+        """ key of the cal_cache entry: bus port, mux channels on the way,
+            address and chip ID, e.g. "0/70.1/76/60"
+        """
+        chip_id = self.read_mem(BME280_REGISTER_CHIPID, 1)[0]
+        path = []
+        if self._mux is not None:
+            path.append("{:02x}.{}".format(self._mux.address, self._channel))
+        bus = self._bus
+        while hasattr(bus, "mux") and hasattr(bus, "number"):
+            path.append("{:02x}.{}".format(bus.mux.address, bus.number))
+            bus = bus.mux.i2c
+        path.append(str(getattr(bus, "_port", "")))
+        path.reverse()
+        return "{}/{:02x}/{:02x}".format("/".join(path), self._addr, chip_id)
+
+    def set_calibration(self, dig_88_a1, dig_e1_e7):
+        """ Unpacks the calibration NVM content.
+
+            Args:
+                dig_88_a1: 26 bytes read from BME280_REGISTER_CALIB_0
+                dig_e1_e7: 7 bytes read from BME280_REGISTER_CALIB_26
+        """
+        # NVM content, e.g. for the header of a sample_log
+        self.calibration = bytes(dig_88_a1) + bytes(dig_e1_e7)
         self.dig_T1, self.dig_T2, self.dig_T3, self.dig_P1, \
             self.dig_P2, self.dig_P3, self.dig_P4, self.dig_P5, \
             self.dig_P6, self.dig_P7, self.dig_P8, self.dig_P9, \
@@ -129,17 +324,26 @@ class BME280(I2CDEV):
         # unfold H4, H5, keeping care of a potential sign
         self.dig_H4 = (self.dig_H4 * 16) + (self.dig_H5 & 0xF)
         self.dig_H5 //= 16
-
-        # temporary data holders which stay allocated
-        self._l1_barray = bytearray(1)
-        self._l8_barray = bytearray(8)
-        self._l3_resultarray = array("i", [0, 0, 0])
-
-        self._l1_barray[0] = self._mode_temp << 5 | self._mode_press << 2 | MODE_SLEEP
-        self.write_mem(BME280_REGISTER_CONTROL,
-                             self._l1_barray)
         self.t_fine = 0
-        return
+
+        # constant sub-expressions of compensate_float, folded once
+        self._coef = (
+            self.dig_T1 / 1024.0, self.dig_T1 / 8192.0,
+            float(self.dig_T2), float(self.dig_T3),
+            float(self.dig_P1), float(self.dig_P2),
+            self.dig_P3 / 524288.0, self.dig_P4 * 65536.0,
+            self.dig_P5 * 2.0, self.dig_P6 / 32768.0, float(self.dig_P7),
+            self.dig_P8 / 32768.0, self.dig_P9 / 2147483648.0,
+            self.dig_H1 / 524288.0, self.dig_H2 / 65536.0,
+            self.dig_H3 / 67108864.0, self.dig_H4 * 64.0,
+            self.dig_H5 / 16384.0, self.dig_H6 / 67108864.0)
+        # and of compensate_int, the shifted ones are long ints
+        self._coef_int = (
+            self.dig_T1 << 1, self.dig_T1, self.dig_T2, self.dig_T3,
+            self.dig_P1, self.dig_P2, self.dig_P3, self.dig_P4 << 35,
+            self.dig_P5, self.dig_P6, self.dig_P7 << 4, self.dig_P8,
+            self.dig_P9, self.dig_H1, self.dig_H2, self.dig_H3,
+            self.dig_H4 << 20, self.dig_H5, self.dig_H6)
 
     def read_raw_data(self, result):
         """ Reads the raw (uncompensated) data from the sensor.
@@ -150,28 +354,87 @@ class BME280(I2CDEV):
             Returns:
                 None
         """
+        if self._op_mode == MODE_NORMAL:
+            # the sensor converts on its own, the data registers
+            # always hold the latest complete conversion
+            self.read_burst(result)
+            return
 
+        self.trigger()
+        self.collect(result)
+
+    def trigger(self):
+        """ Starts a conversion in forced mode and returns immediately.
+
+            Returns:
+                deadline in time.ticks_us() units, after which collect
+                can read the result without waiting
+        """
+        if self._op_mode == MODE_NORMAL:
+            self._deadline = time.ticks_us()
+            return self._deadline
         self._l1_barray[0] = self._mode_hum
         self.write_mem(BME280_REGISTER_CONTROL_HUM, self._l1_barray)
         self._l1_barray[0] = self._mode_temp << 5 | self._mode_press << 2 | MODE_FORCED
         self.write_mem(BME280_REGISTER_CONTROL, self._l1_barray)
+        self._deadline = time.ticks_add(time.ticks_us(), self._t_measure_us)
+        return self._deadline
 
-        # wait up to about 5 ms for the conversion to start
-        for _ in range(5):
-            if self.read_mem(BME280_REGISTER_STATUS, 1)[0] & 0x08:
-                break;  # The conversion is started.
-            time.sleep_ms(1)  # still not busy
-        # Wait for conversion to complete
-        for _ in range(BME280_TIMEOUT):
-            if self.read_mem(BME280_REGISTER_STATUS, 1)[0] & 0x08:
-                time.sleep_ms(10)  # still busy
+    def collect(self, result):
+        """ Waits for the conversion started by trigger and reads
+            the raw data.
+
+            Args:
+                result: array of length 3 or alike where the result will be
+                stored, in temperature, pressure, humidity order
+        """
+        if self._deadline is None:
+            self.trigger()
+        if self._op_mode != MODE_NORMAL:
+            wait = time.ticks_diff(self._deadline, time.ticks_us())
+            if wait > 0:
+                time.sleep_us(wait)
+            # the deadline is the datasheet maximum, so normally the
+            # first status check already finds the sensor ready
+            for _ in range(BME280_TIMEOUT):
+                if not self.busy():
+                    break  # Sensor ready
+                time.sleep_ms(1)  # still busy
             else:
-                break  # Sensor ready
-        else:
-            raise RuntimeError("Sensor BME280 not ready")
+                raise RuntimeError("Sensor BME280 not ready")
+        self._deadline = None
+        self.read_burst(result)
+
+    def busy(self):
+        """ True while the sensor is converting
+        """
+        self.read_mem_into(BME280_REGISTER_STATUS, self._l1_barray)
+        return bool(self._l1_barray[0] & 0x08)
+
+    @property
+    def deadline(self):
+        """ time.ticks_us() value at which the pending conversion is
+            finished, None if no conversion was triggered
+        """
+        return self._deadline
+
+    @property
+    def measurement_time_us(self):
+        """ maximum conversion time for the configured oversampling,
+            according to the datasheet (chapter 9.1)
+        """
+        return self._t_measure_us
+
+    def read_burst(self, result):
+        """ Reads the data registers without starting a conversion.
 
+            Args:
+                result: array of length 3 or alike where the result will be
+                stored, in temperature, pressure, humidity order
+        """
         # burst readout from 0xF7 to 0xFE, recommended by datasheet
-        readout = self.read_mem(BME280_REGISTER_PRESS, 8)
+        readout = self._l8_barray
+        self.read_mem_into(BME280_REGISTER_PRESS, readout)
         # pressure(0xF7): ((msb << 16) | (lsb << 8) | xlsb) >> 4
         raw_press = ((readout[0] << 16) | (readout[1] << 8) | readout[2]) >> 4
         # temperature(0xFA): ((msb << 16) | (lsb << 8) | xlsb) >> 4
@@ -183,64 +446,215 @@ class BME280(I2CDEV):
         result[1] = raw_press
         result[2] = raw_hum
 
-    def ReadAllMeasures(self):
-        """ Reads the data from the sensor and returns the compensated data.
-
-            Args:
-                result: array of length 5 or alike where the result will be
-                stored, in temperature, pressure, humidity, dew point, density
-                order. You may use this to read out the sensor without
-                allocating heap memory
+    def compensate_float(self, raw_temp, raw_press, raw_hum):
+        """ Bosch floating point compensation.
 
             Returns:
-                array with temperature, pressure, humidity, dew point, density.
-                Will be the one from the result parameter if not None
+                tuple with temperature in °C, pressure in Pa
+                and humidity in %
         """
-        self.read_raw_data(self._l3_resultarray)
-        raw_temp, raw_press, raw_hum = self._l3_resultarray
+        T1_1024, T1_8192, T2, T3, P1, P2, P3_524288, P4_65536, P5_2, \
+            P6_32768, P7, P8_32768, P9_2147483648, H1_524288, H2_65536, \
+            H3_67108864, H4_64, H5_16384, H6_67108864 = self._coef
         # temperature
-        var1 = (raw_temp/16384.0 - self.dig_T1/1024.0) * self.dig_T2
-        var2 = raw_temp/131072.0 - self.dig_T1/8192.0
-        var2 = var2 * var2 * self.dig_T3
-        self.t_fine = int(var1 + var2)
-        temp = (var1 + var2) / 5120.0
+        var1 = (raw_temp/16384.0 - T1_1024) * T2
+        var2 = raw_temp/131072.0 - T1_8192
+        var2 = var2 * var2 * T3
+        t_fine = var1 + var2
+        self.t_fine = int(t_fine)
+        temp = t_fine / 5120.0
         temp = max(-40, min(85, temp))
 
         # pressure
         var1 = (self.t_fine/2.0) - 64000.0
-        var2 = var1 * var1 * self.dig_P6 / 32768.0 + var1 * self.dig_P5 * 2.0
-        var2 = (var2 / 4.0) + (self.dig_P4 * 65536.0)
-        var1 = (self.dig_P3 * var1 * var1 / 524288.0 + self.dig_P2 * var1) / 524288.0
-        var1 = (1.0 + var1 / 32768.0) * self.dig_P1
+        var2 = var1 * var1 * P6_32768 + var1 * P5_2
+        var2 = (var2 / 4.0) + P4_65536
+        var1 = (P3_524288 * var1 * var1 + P2 * var1) / 524288.0
+        var1 = (1.0 + var1 / 32768.0) * P1
         if (var1 == 0.0):
             pressure = 30000  # avoid exception caused by division by zero
         else:
             p = ((1048576.0 - raw_press) - (var2 / 4096.0)) * 6250.0 / var1
-            var1 = self.dig_P9 * p * p / 2147483648.0
-            var2 = p * self.dig_P8 / 32768.0
-            pressure = p + (var1 + var2 + self.dig_P7) / 16.0
+            var1 = P9_2147483648 * p * p
+            var2 = p * P8_32768
+            pressure = p + (var1 + var2 + P7) / 16.0
             pressure = max(30000, min(110000, pressure))
 
         # humidity
         h = (self.t_fine - 76800.0)
-        h = ((raw_hum - (self.dig_H4 * 64.0 + self.dig_H5 / 16384.0 * h)) *
-             (self.dig_H2 / 65536.0 * (1.0 + self.dig_H6 / 67108864.0 * h *
-                                       (1.0 + self.dig_H3 / 67108864.0 * h))))
-        humidity = h * (1.0 - self.dig_H1 * h / 524288.0)
+        h = ((raw_hum - (H4_64 + H5_16384 * h)) *
+             (H2_65536 * (1.0 + H6_67108864 * h *
+                          (1.0 + H3_67108864 * h))))
+        humidity = h * (1.0 - H1_524288 * h)
         if (humidity < 0):
             humidity = 0
         if (humidity > 100):
             humidity = 100.0
-            
 
-        self.measures["temp"][0] = temp
-        self.measures["humi"][0] = humidity
-        self.measures["pres"][0] = (pressure / 100)
+        return temp, pressure, humidity
+
+    def compensate_int(self, raw_temp, raw_press, raw_hum, result):
+        """ Bosch integer compensation (int32 temperature and humidity,
+            int64 pressure reference formulas). Creates no float objects.
+
+            Args:
+                result: array of length 3 or alike where the result will be
+                stored: temperature in 0.01°C, pressure in Pa * 256
+                and humidity in % * 1024
+        """
+        T1_2, T1, T2, T3, P1, P2, P3, P4_35, P5, P6, P7_4, P8, P9, \
+            H1, H2, H3, H4_20, H5, H6 = self._coef_int
+        # temperature
+        var1 = (((raw_temp >> 3) - T1_2) * T2) >> 11
+        var2 = (raw_temp >> 4) - T1
+        var2 = (((var2 * var2) >> 12) * T3) >> 14
+        t_fine = var1 + var2
+        self.t_fine = t_fine
+        temp = (t_fine * 5 + 128) >> 8
+        temp = max(-4000, min(8500, temp))
+
+        # pressure
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * P6
+        var2 = var2 + ((var1 * P5) << 17)
+        var2 = var2 + P4_35
+        var1 = ((var1 * var1 * P3) >> 8) + ((var1 * P2) << 12)
+        var1 = (((1 << 47) + var1) * P1) >> 33
+        if var1 == 0:
+            pressure = 30000 << 8  # avoid exception caused by division by zero
+        else:
+            p = 1048576 - raw_press
+            p = (((p << 31) - var2) * 3125) // var1
+            var1 = (P9 * (p >> 13) * (p >> 13)) >> 25
+            var2 = (P8 * p) >> 19
+            pressure = ((p + var1 + var2) >> 8) + P7_4
+            pressure = max(30000 << 8, min(110000 << 8, pressure))
+
+        # humidity
+        h = t_fine - 76800
+        h = ((((raw_hum << 14) - H4_20 - (H5 * h)) +
+              16384) >> 15) * \
+            (((((((h * H6) >> 10) *
+                 (((h * H3) >> 11) + 32768)) >> 10) + 2097152) *
+              H2 + 8192) >> 14)
+        h = h - (((((h >> 15) * (h >> 15)) >> 7) * H1) >> 4)
+        h = max(0, min(419430400, h))
+
+        result[0] = temp
+        result[1] = pressure
+        result[2] = h >> 12
+
+    def read_int(self, result=None):
+        """ Reads the sensor and compensates with the integer engine,
+            without allocating float objects.
+
+            Args:
+                result: array of length 3 or alike where the result will be
+                stored, see compensate_int. An internal array is used
+                if None
+
+            Returns:
+                the result array
+        """
+        if result is None:
+            result = self._l3_intresult
+        self.read_raw_data(self._l3_resultarray)
+        raw_temp, raw_press, raw_hum = self._l3_resultarray
+        self.compensate_int(raw_temp, raw_press, raw_hum, result)
+        return result
+
+    def ReadAllMeasures(self):
+        """ Reads the data from the sensor and returns the compensated data,
+            using the engine selected by the compensation parameter.
+            Computes dew point and density (log and exp) for the returned
+            array and allocates it, loops which need temperature, pressure
+            and humidity only use read_tph_into.
+
+            Returns:
+                array with temperature, pressure, humidity, dew point, density.
+        """
+        self.read_raw_data(self._l3_resultarray)
+        return self.update_measures(self._l3_resultarray)
+
+    def read_tph_into(self, result):
+        """ Reads the sensor like ReadAllMeasures, without allocating and
+            without computing the derived quantities, these follow on
+            the first access of dew_point, density or qnh.
+
+            Args:
+                result: array('f') of length 3 or alike, gets temperature,
+                pressure (Pa) and humidity
+
+            Returns:
+                the result array
+        """
+        self.read_raw_data(self._l3_resultarray)
+        return self.update_measures(self._l3_resultarray, result)
+
+    def update_measures(self, raw, result=None):
+        """ Compensates raw data and stores it into measures.
+
+            Args:
+                raw: array of length 3 or alike, as filled by read_raw_data
+                result: array of length 3 or alike for temperature,
+                pressure and humidity, a new array including dew point
+                and density if None
+
+            Returns:
+                array with temperature, pressure, humidity(, dew point, density).
+        """
+        raw_temp, raw_press, raw_hum = raw
+        if self.compensation == BME280_COMP_INT:
+            self.compensate_int(raw_temp, raw_press, raw_hum, self._l3_intresult)
+            t, p, h = self._l3_intresult
+            temp, pressure, humidity = t / 100, p / 256, h / 1024
+        else:
+            temp, pressure, humidity = self.compensate_float(raw_temp, raw_press, raw_hum)
+
+        values = self.record.values
+        values[_TEMP] = temp
+        values[_HUMI] = humidity
+        values[_PRES] = pressure / 100
         self.measuresValid = True
-        self.measures["dewp"][0] = self.dew_point
-        self.measures["dens"][0] = self.density
-        
-        return array("f", (temp, pressure, humidity, self.measures["dewp"][0], self.measures["dens"][0]))
+        self._derived = 0
+        if self.history is not None:
+            self._derive()
+            self.history.record(self)
+
+        if result is None:
+            return array("f", (temp, pressure, humidity,
+                               self.dew_point, self.density))
+        result[0] = temp
+        result[1] = pressure
+        result[2] = humidity
+        return result
+
+    def _derive(self):
+        """ fills dew point and density into record """
+        if self.measuresValid:
+            self.dew_point
+            self.density
+
+    def _saturation(self):
+        """ saturation vapour pressure in hPa at the current temperature,
+            computed once per sample together with the Magnus term
+            17.62 t / (243.12 + t) which dew_point shares
+        """
+        if not self._derived & _HAVE_E_S:
+            t = self.record.values[_TEMP]
+            self._magnus = 17.62 * t / (243.12 + t)
+            self._e_s = 6.112 * exp(self._magnus)
+            self._derived |= _HAVE_E_S
+        return self._e_s
+
+    @property
+    def measures(self):
+        """ {key: [value, unit, label_en, label_de]} view of record, read
+            only: it is refreshed from record on every access, changes to
+            it are lost, set values with record.set(key, value)
+        """
+        self._derive()
+        return self.record.view()
 
     @property
     def altitude(self):
@@ -249,22 +663,25 @@ class BME280(I2CDEV):
     @altitude.setter
     def altitude(self, value):
         self.__altitude = 1.0 * value #save as float
+        self._derived &= ~_HAVE_QNH
 
     @property
     def qnh(self):
         '''
         QNH in hPa.
         '''
-        t = self.measures["temp"][0]
-        p = self.measures["pres"][0]
-        h = self.measures["humi"][0]
-        d = self.measures["dens"][0]
-        dh = self.__altitude
-        e_s = 6.112 * exp(17.62 * t / (243.12 + t))
-        e = e_s * h / 100.0
-        t_v = (t + 273.15) / (1.0 - e / (p * 100) * (1 - 0.62197))
-        q = p * exp((9.80665 * dh) / (287.05 * (t_v))) 
-        return q
+        if not self.measuresValid:
+            return None
+        if not self._derived & _HAVE_QNH:
+            t = self.record.values[_TEMP]
+            p = self.record.values[_PRES]
+            h = self.record.values[_HUMI]
+            dh = self.__altitude
+            e = self._saturation() * h / 100.0
+            t_v = (t + 273.15) / (1.0 - e / (p * 100) * (1 - 0.62197))
+            self._qnh = p * exp((9.80665 * dh) / (287.05 * (t_v)))
+            self._derived |= _HAVE_QNH
+        return self._qnh
 
     @property
     def temperature(self):
@@ -272,7 +689,7 @@ class BME280(I2CDEV):
         Temperature
         """
         if self.measuresValid:
-            return self.measures["temp"][0]
+            return self.record.values[_TEMP]
         else:
             return None
 
@@ -282,7 +699,7 @@ class BME280(I2CDEV):
         Pressure
         """
         if self.measuresValid:
-            return self.measures["pres"][0]
+            return self.record.values[_PRES]
         else:
             return None
 
@@ -292,7 +709,7 @@ class BME280(I2CDEV):
         Humidity
         """
         if self.measuresValid:
-            return self.measures["humi"][0]
+            return self.record.values[_HUMI]
         else:
             return None
 
@@ -304,10 +721,13 @@ class BME280(I2CDEV):
         """
         if not self.measuresValid:
             return None
-        h = (log(self.measures["humi"][0], 10) - 2) / 0.4343 + \
-            (17.62 * self.measures["temp"][0]) / \
-            (243.12 + self.measures["temp"][0])
-        return 243.12 * h / (17.62 - h)
+        values = self.record.values
+        if not self._derived & _HAVE_DEWP:
+            self._saturation()
+            h = (log(values[_HUMI], 10) - 2) / 0.4343 + self._magnus
+            values[_DEWP] = 243.12 * h / (17.62 - h)
+            self._derived |= _HAVE_DEWP
+        return values[_DEWP]
 
     @property
     def density(self):
@@ -317,20 +737,27 @@ class BME280(I2CDEV):
         """
         if not self.measuresValid:
             return None
-        Rs = 287.058
-        Rd = 461.523
-        t = self.measures["temp"][0]
-        p = self.measures["pres"][0]
-        h = self.measures["humi"][0]
-        steamPressure = 6.112 * exp(17.62 * t / (243.12 + t))
-        Rf = Rs / (1.0 - h/100.0 * steamPressure / p * (1.0 - Rs/Rd))
-        return p * 100.0 / (Rf * (t + 273.15))
+        values = self.record.values
+        if not self._derived & _HAVE_DENS:
+            Rs = 287.058
+            Rd = 461.523
+            t = values[_TEMP]
+            p = values[_PRES]
+            h = values[_HUMI]
+            steamPressure = self._saturation()
+            Rf = Rs / (1.0 - h/100.0 * steamPressure / p * (1.0 - Rs/Rd))
+            values[_DENS] = p * 100.0 / (Rf * (t + 273.15))
+            self._derived |= _HAVE_DENS
+        return values[_DENS]
         
     @property
     def values(self):
-        """ human readable values """
-
-        t, p, h, dp, d = self.ReadAllMeasures()
+        """ human readable values of the last sample, reads one if none """
+        if not self.measuresValid:
+            self.ReadAllMeasures()
+        values = self.record.values
+        t, p, h = values[_TEMP], values[_PRES], values[_HUMI]
+        dp, d = self.dew_point, self.density
 
-        return ("{:.2f}°C".format(t), "{:.2f}hPa".format(p/100),
+        return ("{:.2f}°C".format(t), "{:.2f}hPa".format(p),
                 "{:.2f}%".format(h), "{:.2f}°C".format(dp), "{:.2f}kg/m³".format(d))
\ No newline at end of file
@@ -0,0 +1,80 @@
+# Adds the MicroPython extensions of the time module and the const()
+# builtin to CPython, so the drivers run unmodified, on the simulator
+# (SIM/) as well as on a Linux host (LINUX/).
+# Imported at startup by CPYTHON/sitecustomize.py and by SIM/sim_compat.py.
+import builtins
+import sys
+import time
+from micropython import const
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+
+def ticks_ms():
+    return int(time.monotonic() * 1000) & _TICKS_MAX
+
+def ticks_us():
+    return int(time.monotonic() * 1000_000) & _TICKS_MAX
+
+def ticks_cpu():
+    return time.perf_counter_ns() & _TICKS_MAX
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+
+def sleep_ms(ms):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+def sleep_us(us):
+    if us > 0:
+        time.sleep(us / 1000_000)
+
+
+class _CaseInsensitiveFinder():
+    '''
+    the Test scripts import the drivers by their file names on the board
+    (bme280, sdp8XX, sps30), which differ in case from the repository
+    '''
+    ALIASES = {"bme280": "BME280", "sdp8xx": "SDP8XX", "sps30": "SPS30"}
+
+    def find_spec(self, fullname, path=None, target=None):
+        name = self.ALIASES.get(fullname.lower())
+        if name is None or name == fullname:
+            return None
+        import importlib.util
+        spec = importlib.util.find_spec(name)
+        if spec is not None:
+            spec.name = name
+            spec.loader = _AliasLoader(name)
+        return spec
+
+
+class _AliasLoader():
+    def __init__(self, name):
+        self._name = name
+
+    def create_module(self, spec):
+        import importlib
+        return importlib.import_module(self._name)
+
+    def exec_module(self, module):
+        pass
+
+
+def install():
+    if not hasattr(builtins, "const"):
+        builtins.const = const
+    for func in (ticks_ms, ticks_us, ticks_cpu, ticks_add, ticks_diff,
+                 sleep_ms, sleep_us):
+        if not hasattr(time, func.__name__):
+            setattr(time, func.__name__, func)
+    if not any(isinstance(f, _CaseInsensitiveFinder) for f in sys.meta_path):
+        sys.meta_path.append(_CaseInsensitiveFinder())
+
+install()
@@ -0,0 +1,2 @@
+# imported by CPython at startup when CPYTHON is on PYTHONPATH
+import cpython_compat
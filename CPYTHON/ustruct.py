@@ -0,0 +1,2 @@
+# CPython stand-in for the MicroPython ustruct module
+from struct import *
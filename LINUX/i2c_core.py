@@ -0,0 +1,132 @@
+# I2CBUS for Linux i2c-dev (/dev/i2c-N), each transfer is one I2C_RDWR
+# ioctl, a write followed by a read is one combined transfer with a
+# repeated START. The drivers also need the MicroPython extensions of
+# CPYTHON/cpython_compat.py:  PYTHONPATH=LINUX:CPYTHON:. python3 ...
+import os
+from ctypes import Structure, POINTER, c_uint8, c_uint16, c_uint32, c_char_p, cast
+from i2c_common import I2CBusMixin, I2CDEV
+
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+I2C_RDWR_MSGS = 4  # preallocated messages, more are allocated on demand
+
+
+class i2c_msg(Structure):
+    _fields_ = [("addr", c_uint16),
+                ("flags", c_uint16),
+                ("len", c_uint16),
+                ("buf", POINTER(c_uint8))]
+
+
+class i2c_rdwr_ioctl_data(Structure):
+    _fields_ = [("msgs", POINTER(i2c_msg)),
+                ("nmsgs", c_uint32)]
+
+
+def _buffer(buf, writable=False):
+    '''
+    (pointer, object to keep alive) for the memory of buf,
+    without a copy unless buf is a read-only view
+    '''
+    if isinstance(buf, bytes):
+        if writable:
+            raise TypeError("read buffer must be writable")
+        return cast(c_char_p(buf), POINTER(c_uint8)), buf
+    try:
+        data = (c_uint8 * len(buf)).from_buffer(buf)
+    except TypeError:
+        if writable:
+            raise
+        data = (c_uint8 * len(buf)).from_buffer_copy(buf)
+    return cast(data, POINTER(c_uint8)), data
+
+
+class I2CBUS(I2CBusMixin):
+    '''
+    fd, ioctl: an open file descriptor of the adapter and the ioctl
+    function, for tests e.g. a shim which plays the kernel
+    '''
+    def __init__(self, port, scl=None, sda=None, freq=None, fd=None, ioctl=None):
+        self._init_bus(port, scl, sda, freq)
+        if ioctl is None:
+            from fcntl import ioctl
+        self._ioctl = ioctl
+        if fd is None:
+            fd = os.open("/dev/i2c-{}".format(port), os.O_RDWR)
+            self._own_fd = True
+        else:
+            self._own_fd = False
+        self._fd = fd
+        self._msgs = (i2c_msg * I2C_RDWR_MSGS)()
+        self._rdwr = i2c_rdwr_ioctl_data(self._msgs, 0)
+
+    def __str__(self):
+        return f"I2C(/dev/i2c-{self._port})"
+
+    def close(self):
+        if self._own_fd and self._fd is not None:
+            os.close(self._fd)
+        self._fd = None
+
+    def transfer(self, addr, segments):
+        '''
+        one I2C_RDWR call, segments are (buffer, read) pairs which are
+        separated by repeated STARTs, see i2c_common.transfer_segments
+        '''
+        if len(segments) > len(self._msgs):
+            self._msgs = (i2c_msg * len(segments))()
+            self._rdwr.msgs = self._msgs
+        keep = []
+        for i in range(len(segments)):
+            buf, read = segments[i]
+            if type(buf) is tuple:
+                buf = b"".join(bytes(part) for part in buf)
+            msg = self._msgs[i]
+            msg.addr = addr
+            msg.flags = I2C_M_RD if read else 0
+            msg.len = len(buf)
+            msg.buf, data = _buffer(buf, read)
+            keep.append(data)
+        self._rdwr.nmsgs = len(segments)
+        self._ioctl(self._fd, I2C_RDWR, self._rdwr)
+
+    # the kernel ends every ioctl with a STOP, stop=False can't be kept
+    def writeto(self, addr, buf, stop=True):
+        self.transfer(addr, ((buf, False),))
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        self.transfer(addr, ((tuple(vector), False),))
+        return sum(len(buf) for buf in vector)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.transfer(addr, ((buf, True),))
+
+    def readfrom(self, addr, nbytes, stop=True):
+        buf = bytearray(nbytes)
+        self.readfrom_into(addr, buf)
+        return bytes(buf)
+
+    def writeto_then_readfrom(self, addr, out_buf, in_buf):
+        self.transfer(addr, ((out_buf, False), (in_buf, True)))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self.writeto(addr, memaddr.to_bytes(addrsize // 8, "big") + bytes(buf))
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        self.writeto_then_readfrom(addr, memaddr.to_bytes(addrsize // 8, "big"), buf)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        return bytes(buf)
+
+    def scan(self):
+        found = []
+        for addr in range(0x08, 0x78):
+            try:
+                self.writeto(addr, b"")
+            except OSError:
+                continue
+            found.append(addr)
+        return found
@@ -3,6 +3,8 @@ from ustruct import unpack, unpack_from
 from array import array
 from math import exp, log
 from i2c_core import *
+from sensirion_crc import calc_crc, check_words, chk_crc
+from measure_record import MeasureRecord
 
 # BME280 default address.
 SDP810_I2CADDR = 0x25
@@ -32,63 +34,56 @@ SDP_811_500 = '03020D01'
 SDP_800_125 = '03020201'
 SDP_810_125 = '03020B01'
 
+# scale factor of the differential pressure in 1/Pa, the same in both modes
+SDP8XX_SCALES = {
+    SDP_800_500: 60, SDP_810_500: 60, SDP_801_500: 60, SDP_811_500: 60,
+    SDP_800_125: 240, SDP_810_125: 240}
+
 SDP8XX_CLK_SPEED_HZ = 100_000
+# pressure only reads between two full reads
+SDP8XX_FULL_EVERY = 100
+
+# Measures: key, unit, english and german label
+SDP8XX_MEASURES = (
+    ("pres", "Pa", "Differential Pressure", "Druckdifferenz"),
+    ("temp", "°C", "Temperature", "Temperatur"))
+_PRES = const(0)
+_TEMP = const(1)
+
+def _int16(msb, lsb):
+    v = (msb << 8) | lsb
+    if v & 0x8000:
+        v -= 0x10000
+    return v
 
-def calc_crc(data):
-    '''
-    calculates CRC-8 for 2 bytes
-    according Sensirion SDP8XX spec
-    Width: 8 bit
-    Polynom: 0x31
-    Init: 0xFF
-    no Reflects
-    Final XOR: 0x00 (none)
-    '''
-    crc = 0xFF
-    for value in data:
-        crc ^= value
-        for i in range(8):
-            if crc & (1 << 7):
-                crc = (crc << 1) ^ 0x31
-            else:
-                crc = crc << 1
-            crc &= (1 << 8) - 1
-    return crc
-    
-def chk_crc(data):
-    '''
-    Checks if crc of data is correct
-    two data bytes are followed by 1 CRC byte
-    '''
-    if len(data) % 3 == 0:
-        crc_correct = True
-        for i in range(0, len(data), 3):
-            if calc_crc(data[i:i+2]) != int(data[i+2]):
-                #print("{} {:02x}".format(data[i:i+3].hex(), calc_crc(data[i:i+2])))
-                crc_correct = False
-    else:
-        #print("length:", len(data), len(data) % 3)
-        crc_correct = False
-    return crc_correct
-        
 
 class SDP8XX(I2CDEV):
     # creates variables
     MODE_MASS = True;
     MODE_DP = False;
-    measures = {\
-        "pres" : [0.0, "Pa", "Differential Pressure", "Druckdifferenz"],\
-        "temp" : [0.0, "°C", "Temperature", "Temperatur"]}
     measuresValid = False
+    history = None  # optional history.History
+    # keys of measures, in record order
+    MEASURE_KEYS = tuple(m[0] for m in SDP8XX_MEASURES)
  
     def __init__(self,
                  address=SDP810_I2CADDR,
                  i2c=None,
+                 full_every=SDP8XX_FULL_EVERY,
                  **kwargs):
         self.address = address
         if i2c is None:
             raise ValueError('An I2C object is required.')
         self.i2c = i2c
+        self.record = MeasureRecord(SDP8XX_MEASURES)
+        # pressure, temperature and scale factor, each with CRC
+        self._frame = bytearray(9)
+        self._frame_mv = memoryview(self._frame)
+        self._pres_mv = self._frame_mv[0:3]
+        self._scale = 0  # scale factor of the last frame, 0 if unknown
+        self._product = None
+        self.full_every = full_every
+        self._short_reads = full_every
         super().__init__(bus=i2c, dev_id=address, probe_on_bus=True)
         
 
@@ -97,31 +92,44 @@ class SDP8XX(I2CDEV):
         time.sleep(0.1)
         return
     
+    def _read_id(self, answer):
+        # both commands and the answer in one transfer
+        self.batch().write(READ_ID_0).write(READ_ID_1).read(memoryview(answer)).run()
+
     def get_device_type(self):
         answer = bytearray(6)
-        self.write(READ_ID_0)
-        self.write(READ_ID_1)
-        self.read_into(memoryview(answer))
+        self._read_id(answer)
         if chk_crc(answer):
             id = answer[0:2].hex().upper() + answer[3:5].hex().upper()
+            self._product = id
         else:
+            self.crc_failed()
             id = None
         return id
         
     def get_device_serial(self):
         answer = bytearray(18)
-        self.write(READ_ID_0)
-        self.write(READ_ID_1)
-        self.read_into(memoryview(answer))
+        self._read_id(answer)
         if chk_crc(answer):
             sn = ""
             for i in (6,9,12,15):
                 sn += answer[i:i+2].hex().upper()
         else:
+            self.crc_failed()
             sn = None
         return sn
         
     def start_cont_meas(self, mode:bool, averaging:bool):
+        # scale factor of the product, else taken from the first full read.
+        # The ID read is NAKed while a measurement runs, e.g. one left
+        # running before a restart of the host
+        if self._product is None:
+            try:
+                self.get_device_type()
+            except OSError:
+                pass
+        self._scale = SDP8XX_SCALES.get(self._product, 0)
+        self._short_reads = self.full_every
         if mode == self.MODE_MASS:
             if averaging:
                 self.write(START_CONT_MEAS_MASS_AVG)
@@ -146,23 +154,135 @@ class SDP8XX(I2CDEV):
         stores calculated data into measures
         '''
         self.measuresValid = False
-        answer = bytearray(9)
-        self.read_into(memoryview(answer))
-        #print(answer.hex().upper())
-        if chk_crc(answer):
-            p,t,s = unpack(">hxhxhx", answer)
-            self.measures["pres"][0] = float(p) / s
-            self.measures["temp"][0] = float(t) / 200.0
+        self._short_reads = 0
+        frame = self._frame
+        self.read_into(self._frame_mv)
+        #print(frame.hex().upper())
+        if check_words(self._frame_mv) < 0:
+            self._scale = (frame[6] << 8) | frame[7]
+            values = self.record.values
+            values[_PRES] = float(_int16(frame[0], frame[1])) / self._scale
+            values[_TEMP] = float(_int16(frame[3], frame[4])) / 200.0
             self.measuresValid = True
+            if self.history is not None:
+                self.history.record(self)
+        else:
+            self.crc_failed()
         return
+
+    def read_pressure_raw(self):
+        '''
+        fast path of continuous mode: reads only the pressure word (3 bytes)
+        once the scale factor is known, all 9 bytes every full_every
+        samples to update temperature and scale. Raw pressure, Pa =
+        raw / scale, None if the CRC is wrong
+        '''
+        if self._scale == 0 or self._short_reads >= self.full_every:
+            self.ReadAllMeasures()
+            if not self.measuresValid:
+                return None
+        else:
+            self._short_reads += 1
+            self.read_into(self._pres_mv)
+            if check_words(self._pres_mv) >= 0:
+                self.crc_failed()
+                # full read next time, which validates the measures again
+                self.measuresValid = False
+                self._short_reads = self.full_every
+                return None
+        frame = self._frame
+        return _int16(frame[0], frame[1])
+
+    def read_pressure(self):
+        '''
+        differential pressure in Pa by read_pressure_raw,
+        None if the CRC is wrong
+        '''
+        raw = self.read_pressure_raw()
+        if raw is None:
+            return None
+        p = raw / self._scale
+        self.record.values[_PRES] = p
+        return p
+
+    def stream(self, samples, times=None, period_us=500):
+        '''
+        generator for continuous mode, fills samples (array('h') of raw
+        differential pressure) and times (array('l') of ticks_us, optional)
+        with one sample per period_us. Yields the scale factor whenever
+        the arrays are full, pressure in Pa = samples[i] / scale, then
+        fills the same arrays again. Reads like read_pressure_raw and
+        doesn't allocate while streaming
+        '''
+        frame = self._frame
+        n = len(samples)
+        next_t = time.ticks_us()
+        while True:
+            i = 0
+            while i < n:
+                now = time.ticks_us()
+                wait = time.ticks_diff(next_t, now)
+                if wait > 0:
+                    continue
+                if wait < -period_us:
+                    next_t = now  # fell behind, restart the schedule
+                if self._scale == 0 or self._short_reads >= self.full_every:
+                    self._short_reads = 0
+                    mv = self._frame_mv
+                else:
+                    self._short_reads += 1
+                    mv = self._pres_mv
+                self.read_into(mv)
+                if check_words(mv) >= 0:
+                    self.crc_failed()
+                    continue
+                if len(mv) == 9:
+                    self._scale = (frame[6] << 8) | frame[7]
+                    self.record.values[_TEMP] = _int16(frame[3], frame[4]) / 200.0
+                samples[i] = _int16(frame[0], frame[1])
+                if times is not None:
+                    times[i] = now
+                i += 1
+                next_t = time.ticks_add(next_t, period_us)
+            yield self._scale
+
+    def capture(self, samples, times, callback, blocks, period_us=500):
+        '''
+        streams blocks blocks, callback(samples, times, scale)
+        is called for each full block
+        '''
+        stream = self.stream(samples, times, period_us)
+        for i in range(blocks):
+            callback(samples, times, next(stream))
+
+    @staticmethod
+    def to_pascal(samples, scale, out=None):
+        '''
+        raw samples of a block to Pa in out (array('f'), new if None)
+        '''
+        if out is None:
+            out = array("f", [0.0] * len(samples))
+        k = 1.0 / scale
+        for i in range(len(samples)):
+            out[i] = samples[i] * k
+        return out
             
+    @property
+    def measures(self):
+        """
+        {key: [value, unit, label_en, label_de]} view of record, read
+        only: it is refreshed from record on every access, changes to it
+        are lost, set values with record.set(key, value)
+        """
+        return self.record.view()
+
     @property
     def temperature(self):
         """
         Temperature
         """
         if self.measuresValid:
-            return self.measures["temp"][0]
+            return self.record.values[_TEMP]
         else:
             return None
 
@@ -172,7 +292,7 @@ class SDP8XX(I2CDEV):
         Pressure
         """
         if self.measuresValid:
-            return self.measures["pres"][0]
+            return self.record.values[_PRES]
         else:
             return None
 
@@ -181,6 +301,6 @@ class SDP8XX(I2CDEV):
         """ human readable values """
 
         if self.measuresValid:
-            p = self.measures["pres"][0]
-            t = self.measures["temp"][0]
+            p = self.record.values[_PRES]
+            t = self.record.values[_TEMP]
             return ("{:.2f}Pa".format(p), "{:.2f}°C".format(t))
@@ -0,0 +1,6 @@
+# hardware definitions for the simulated bus, see sim_devices.default_devices
+
+class HW_DEFS():
+    PORT = 0
+    SCL = 22
+    SDA = 21
@@ -0,0 +1,129 @@
+# CPython stand-in for machine.I2C: a simulated bus with a bit-rate
+# timing model and register level device models (sim_devices.py).
+#
+#   PYTHONPATH=SIM:MPY:. python3 Test_BME280.py
+import time
+from errno import ENODEV
+import sim_compat
+from sim_devices import SimPCA9548, default_devices
+
+
+class Pin():
+    def __init__(self, id, *args, **kwargs):
+        self.id = id
+
+    def __repr__(self):
+        return "Pin({})".format(self.id)
+
+
+class I2C():
+    '''
+    simulated I2C bus, API of machine.I2C
+    devices: device models on the bus, default_devices() if None
+    realtime: each transfer takes as long as it would on the wire
+    '''
+    topology = staticmethod(default_devices)
+
+    def __init__(self, id=0, *, scl=None, sda=None, freq=400_000,
+                 devices=None, realtime=False, **kwargs):
+        self.id = id
+        self.freq = freq
+        self.realtime = realtime
+        self.devices = self.topology() if devices is None else list(devices)
+        self.reset_stats()
+
+    def attach(self, device):
+        self.devices.append(device)
+        return device
+
+    def reset_stats(self):
+        self.transfers = 0      # START conditions incl. repeated starts
+        self.bytes_written = 0  # payload, without address bytes
+        self.bytes_read = 0
+        self.naks = 0
+        self.bus_time_us = 0.0
+
+    def stats(self):
+        return {"transfers": self.transfers,
+                "bytes_written": self.bytes_written,
+                "bytes_read": self.bytes_read,
+                "naks": self.naks,
+                "bus_time_us": self.bus_time_us}
+
+    def bus_time(self, nbytes, stop=True, freq=None):
+        '''
+        µs for one transfer of nbytes after the address byte
+        '''
+        bits = 1 + 9 * (1 + nbytes) + (1 if stop else 0)
+        return bits * 1000_000 / (freq or self.freq)
+
+    def _account(self, written, read, stop):
+        self.transfers += 1
+        self.bytes_written += written
+        self.bytes_read += read
+        us = self.bus_time(written + read, stop)
+        self.bus_time_us += us
+        if self.realtime:
+            end = time.perf_counter() + us / 1000_000
+            while time.perf_counter() < end:
+                pass
+
+    def _reachable(self, devices=None):
+        for device in self.devices if devices is None else devices.values():
+            yield device
+            if isinstance(device, SimPCA9548):
+                for channel in device.routed():
+                    yield from self._reachable(channel)
+
+    def _device(self, addr):
+        for device in self._reachable():
+            if device.address == addr:
+                return device
+        self.naks += 1
+        raise OSError(ENODEV)
+
+    def scan(self):
+        found = []
+        for addr in range(0x08, 0x78):
+            self._account(0, 0, True)
+            if any(d.address == addr for d in self._reachable()):
+                found.append(addr)
+        return found
+
+    def writeto(self, addr, buf, stop=True):
+        self._account(len(buf), 0, stop)
+        if addr == 0:
+            for device in list(self._reachable()):
+                device.general_call(bytes(buf))
+            return len(buf)
+        self._device(addr).write(bytes(buf))
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        data = b"".join(bytes(buf) for buf in vector)
+        return self.writeto(addr, data, stop)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self._account(0, len(buf), stop)
+        self._device(addr).read_into(buf)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        buf = bytearray(nbytes)
+        self.readfrom_into(addr, buf, stop)
+        return bytes(buf)
+
+    def _memaddr(self, memaddr, addrsize):
+        return memaddr.to_bytes(addrsize // 8, "big")
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self.writeto(addr, self._memaddr(memaddr, addrsize) + bytes(buf))
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        # register address write, repeated start, read
+        self.writeto(addr, self._memaddr(memaddr, addrsize), False)
+        self.readfrom_into(addr, buf)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        return bytes(buf)
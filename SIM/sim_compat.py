@@ -0,0 +1,48 @@
+# The simulator on top of the CPython compatibility layer of CPYTHON/,
+# which is put on sys.path, plus the memory statistics of the gc module.
+# Imported at startup by SIM/sitecustomize.py and by the simulated machine.
+import gc
+import os
+import sys
+import tracemalloc
+
+_SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+_COMPAT_DIR = os.path.join(os.path.dirname(_SIM_DIR), "CPYTHON")
+if _COMPAT_DIR not in sys.path:
+    sys.path.append(_COMPAT_DIR)
+import cpython_compat
+
+
+_alloc_total = 0
+_alloc_last = 0
+
+def mem_alloc():
+    '''
+    bytes allocated by Python objects since the first call, also those
+    freed again: CPython frees at once, MicroPython only at gc.collect().
+    The heap growth above the level of the previous call (the peak since
+    then) is added up, a lower bound for several allocations in between.
+    Allocations of the simulator are included, they are counted
+    together with those of the drivers
+    '''
+    global _alloc_total, _alloc_last
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _alloc_total = _alloc_last = 0
+        return 0
+    current, peak = tracemalloc.get_traced_memory()
+    _alloc_total += max(0, peak - _alloc_last)
+    _alloc_last = current
+    tracemalloc.reset_peak()
+    return _alloc_total
+
+def mem_free():
+    return 0
+
+
+def install():
+    for func in (mem_alloc, mem_free):
+        if not hasattr(gc, func.__name__):
+            setattr(gc, func.__name__, func)
+
+install()
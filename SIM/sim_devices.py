@@ -0,0 +1,421 @@
+# Register level models of the devices supported by the drivers,
+# attached to the simulated I2C bus of SIM/machine.py
+import time
+from errno import EIO
+from struct import pack
+from sensirion_crc import calc_crc
+
+
+def sensirion_words(words):
+    '''
+    16 bit words to bytes, each word followed by its CRC
+    '''
+    data = bytearray()
+    for word in words:
+        hi, lo = (word >> 8) & 0xFF, word & 0xFF
+        data += bytes((hi, lo, calc_crc((hi, lo))))
+    return data
+
+def sensirion_bytes(raw):
+    '''
+    byte string to bytes with a CRC after every 2 bytes
+    '''
+    data = bytearray()
+    for i in range(0, len(raw), 2):
+        data += raw[i:i+2] + bytes((calc_crc(raw[i:i+2]),))
+    return data
+
+
+class SimDevice():
+    '''
+    base of the device models, a device NAKs by raising OSError
+    '''
+    def __init__(self, address):
+        self.address = address
+
+    def write(self, data):
+        pass
+
+    def read_into(self, buf):
+        raise OSError(EIO)
+
+    def general_call(self, data):
+        pass
+
+
+class SimRegisterDevice(SimDevice):
+    '''
+    device with 8 bit register addresses and auto increment,
+    the first byte written sets the register pointer
+    '''
+    def __init__(self, address):
+        super().__init__(address)
+        self.regs = bytearray(256)
+        self.pointer = 0
+
+    def write(self, data):
+        if not data:
+            return
+        self.pointer = data[0]
+        for value in data[1:]:
+            self.write_reg(self.pointer, value)
+            self.pointer = (self.pointer + 1) & 0xFF
+
+    def read_into(self, buf):
+        self.update()
+        for i in range(len(buf)):
+            buf[i] = self.read_reg(self.pointer)
+            self.pointer = (self.pointer + 1) & 0xFF
+
+    def write_reg(self, reg, value):
+        self.regs[reg] = value
+
+    def read_reg(self, reg):
+        return self.regs[reg]
+
+    def update(self):
+        pass
+
+
+class SimPCA9548(SimDevice):
+    '''
+    8 channel mux, devices behind channel n are attached with
+    attach(n, device), n = 1..8 like PCA9548.enable
+    '''
+    def __init__(self, address=0x70):
+        super().__init__(address)
+        self.control = 0
+        self.channels = [{} for _ in range(8)]
+
+    def attach(self, channel, device):
+        self.channels[channel - 1][device.address] = device
+        return device
+
+    def write(self, data):
+        if data:
+            self.control = data[-1]
+
+    def read_into(self, buf):
+        for i in range(len(buf)):
+            buf[i] = self.control
+
+    def general_call(self, data):
+        pass
+
+    def routed(self):
+        '''
+        device dicts of the enabled channels
+        '''
+        return [self.channels[ch] for ch in range(8) if self.control & (1 << ch)]
+
+
+# typical calibration values of a BME280
+BME280_DIG_T = (27504, 26435, -1000)
+BME280_DIG_P = (36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000)
+BME280_DIG_H = (75, 362, 0, 313, 50, 30)
+
+_BME280_OSRS = (0, 1, 2, 4, 8, 16, 16, 16)
+_BME280_T_SB_MS = (0.5, 62.5, 125, 250, 500, 1000, 10, 20)
+
+
+class SimBME280(SimRegisterDevice):
+    '''
+    BME280 with calibration NVM, status busy flag, forced and normal mode
+    the environment is set by temperature (°C), pressure (Pa), humidity (%)
+    '''
+    def __init__(self, address=0x76, temperature=21.0, pressure=101325.0,
+                 humidity=45.0):
+        super().__init__(address)
+        self.temperature = temperature
+        self.pressure = pressure
+        self.humidity = humidity
+        self.conversions = 0
+        self._reset()
+
+    def _reset(self):
+        regs = self.regs
+        for i in range(256):
+            regs[i] = 0
+        regs[0xD0] = 0x60
+        h1, h2, h3, h4, h5, h6 = BME280_DIG_H
+        regs[0x88:0xA2] = pack("<HhhHhhhhhhhhBB",
+                               *(BME280_DIG_T + BME280_DIG_P + (0, h1)))
+        regs[0xE1:0xE8] = pack("<hBbBBb", h2, h3, h4 >> 4,
+                               ((h5 & 0xF) << 4) | (h4 & 0xF), h5 >> 4, h6)
+        regs[0xF7:0xFF] = b"\x80\x00\x00\x80\x00\x00\x80\x00"
+        self._busy_until = None
+        self._normal_start = None
+
+    def measurement_time(self):
+        '''
+        maximum conversion time in s for the oversampling settings
+        '''
+        osrs_h = _BME280_OSRS[self.regs[0xF2] & 0x07]
+        osrs_t = _BME280_OSRS[self.regs[0xF4] >> 5]
+        osrs_p = _BME280_OSRS[(self.regs[0xF4] >> 2) & 0x07]
+        t = 1.25 + 2.3 * osrs_t
+        if osrs_p:
+            t += 2.3 * osrs_p + 0.575
+        if osrs_h:
+            t += 2.3 * osrs_h + 0.575
+        return t / 1000
+
+    def write_reg(self, reg, value):
+        if reg == 0xE0:
+            if value == 0xB6:
+                self._reset()
+            return
+        if reg in (0xF2, 0xF4, 0xF5):
+            self.regs[reg] = value
+        if reg == 0xF4:
+            mode = value & 0x03
+            now = time.monotonic()
+            if mode in (1, 2):
+                self._busy_until = now + self.measurement_time()
+                self._normal_start = None
+            elif mode == 3:
+                self._normal_start = now
+                self._busy_until = None
+            else:
+                self._normal_start = None
+
+    def read_reg(self, reg):
+        if reg == 0xF3:
+            return 0x08 if self._measuring() else 0x00
+        return self.regs[reg]
+
+    def _measuring(self):
+        now = time.monotonic()
+        if self._busy_until is not None:
+            return now < self._busy_until
+        if self._normal_start is not None:
+            t_meas = self.measurement_time()
+            cycle = t_meas + _BME280_T_SB_MS[self.regs[0xF5] >> 5] / 1000
+            return (now - self._normal_start) % cycle < t_meas
+        return False
+
+    def update(self):
+        now = time.monotonic()
+        if self._busy_until is not None and now >= self._busy_until:
+            self._busy_until = None
+            self.regs[0xF4] &= 0xFC  # back to sleep mode
+            self._latch()
+        elif self._normal_start is not None and \
+                now - self._normal_start >= self.measurement_time():
+            self._latch()
+
+    def _latch(self):
+        self.conversions += 1
+        raw_t, raw_p, raw_h = self.raw_values()
+        self.regs[0xF7:0xFF] = bytes((
+            (raw_p >> 12) & 0xFF, (raw_p >> 4) & 0xFF, (raw_p << 4) & 0xF0,
+            (raw_t >> 12) & 0xFF, (raw_t >> 4) & 0xFF, (raw_t << 4) & 0xF0,
+            (raw_h >> 8) & 0xFF, raw_h & 0xFF))
+
+    def raw_values(self):
+        '''
+        ADC values which compensate to the environment
+        '''
+        raw_t = _bisect(lambda r: _bme280_temp(r)[0], self.temperature, 0, (1 << 20) - 1)
+        t_fine = _bme280_temp(raw_t)[1]
+        raw_p = _bisect(lambda r: -_bme280_press(r, t_fine), -self.pressure, 0, (1 << 20) - 1)
+        raw_h = _bisect(lambda r: _bme280_hum(r, t_fine), self.humidity, 0, (1 << 16) - 1)
+        return raw_t, raw_p, raw_h
+
+
+def _bisect(func, target, low, high):
+    # smallest raw value where the monotonic func reaches target
+    while low < high:
+        mid = (low + high) // 2
+        if func(mid) < target:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+def _bme280_temp(raw):
+    t1, t2, t3 = BME280_DIG_T
+    var1 = (raw / 16384.0 - t1 / 1024.0) * t2
+    var2 = raw / 131072.0 - t1 / 8192.0
+    var2 = var2 * var2 * t3
+    return (var1 + var2) / 5120.0, int(var1 + var2)
+
+def _bme280_press(raw, t_fine):
+    p1, p2, p3, p4, p5, p6, p7, p8, p9 = BME280_DIG_P
+    var1 = t_fine / 2.0 - 64000.0
+    var2 = var1 * var1 * p6 / 32768.0 + var1 * p5 * 2.0
+    var2 = var2 / 4.0 + p4 * 65536.0
+    var1 = (p3 * var1 * var1 / 524288.0 + p2 * var1) / 524288.0
+    var1 = (1.0 + var1 / 32768.0) * p1
+    p = ((1048576.0 - raw) - var2 / 4096.0) * 6250.0 / var1
+    return p + (p9 * p * p / 2147483648.0 + p * p8 / 32768.0 + p7) / 16.0
+
+def _bme280_hum(raw, t_fine):
+    h1, h2, h3, h4, h5, h6 = BME280_DIG_H
+    h = t_fine - 76800.0
+    h = (raw - (h4 * 64.0 + h5 / 16384.0 * h)) * \
+        (h2 / 65536.0 * (1.0 + h6 / 67108864.0 * h * (1.0 + h3 / 67108864.0 * h)))
+    return h * (1.0 - h1 * h / 524288.0)
+
+
+SDP810_500_PRODUCT = 0x03020A01
+SDP8XX_SCALE_500PA = 60    # Pa^-1 for the 500 Pa types
+SDP8XX_FIRST_MEAS_S = 0.008
+
+
+class SimSDP8XX(SimDevice):
+    '''
+    SDP8xx with ID read sequence and continuous modes, a read can be
+    terminated early after any word. pressure in Pa, temperature in °C
+    '''
+    def __init__(self, address=0x25, pressure=12.5, temperature=23.0,
+                 product=SDP810_500_PRODUCT, serial=0x0123456789ABCDEF,
+                 scale=SDP8XX_SCALE_500PA):
+        super().__init__(address)
+        self.pressure = pressure
+        self.temperature = temperature
+        self.product = product
+        self.serial = serial
+        self.scale = scale
+        self.samples = 0
+        self._reset()
+
+    def _reset(self):
+        self._state = "idle"
+        self._id_step = 0
+        self._started = None
+
+    def general_call(self, data):
+        if bytes(data) == b"\x06":
+            self._reset()
+
+    def write(self, data):
+        if not data:
+            return  # address only, e.g. I2CBUS.probe
+        if len(data) != 2:
+            raise OSError(EIO)
+        cmd = (data[0] << 8) | data[1]
+        if cmd in (0x3603, 0x3608, 0x3615, 0x361E):
+            self._state = "continuous"
+            self._started = time.monotonic()
+        elif cmd == 0x3FF9:
+            self._state = "idle"
+        elif cmd == 0x367C:
+            self._id_step = 1
+        elif cmd == 0xE102 and self._id_step == 1:
+            self._state = "id"
+            self._id_step = 0
+        elif cmd == 0x3677:
+            self._state = "sleep"
+
+    def read_into(self, buf):
+        if self._state == "id":
+            p, s = self.product, self.serial
+            data = sensirion_words((p >> 16, p & 0xFFFF,
+                                    (s >> 48) & 0xFFFF, (s >> 32) & 0xFFFF,
+                                    (s >> 16) & 0xFFFF, s & 0xFFFF))
+            self._state = "idle"
+        elif self._state == "continuous":
+            if time.monotonic() - self._started < SDP8XX_FIRST_MEAS_S:
+                raise OSError(EIO)  # no data yet
+            dp = max(-32768, min(32767, round(self.pressure * self.scale)))
+            t = max(-32768, min(32767, round(self.temperature * 200)))
+            data = sensirion_words((dp & 0xFFFF, t & 0xFFFF, self.scale))
+            self.samples += 1
+        else:
+            raise OSError(EIO)
+        n = min(len(buf), len(data))
+        buf[:n] = data[:n]
+
+
+class SimSPS30(SimDevice):
+    '''
+    SPS30 with data ready flag and float or integer measurement frames,
+    a new sample is produced every interval seconds while measuring
+    mass in µg/m³, counts in #/cm³, size in µm
+    '''
+    def __init__(self, address=0x69, interval=1.0,
+                 mass=(5.0, 7.5, 8.25, 9.0),
+                 counts=(30.0, 36.0, 37.0, 37.5, 37.75),
+                 size=0.55):
+        super().__init__(address)
+        self.interval = interval
+        self.mass = mass
+        self.counts = counts
+        self.size = size
+        self.frames = 0
+        self._reset()
+
+    def _reset(self):
+        self._pointer = 0
+        self._started = None
+        self._format = 0x03
+        self._last_sample = 0
+
+    def _sample(self):
+        if self._started is None:
+            return 0
+        return int((time.monotonic() - self._started) / self.interval)
+
+    def write(self, data):
+        if not data:
+            return  # address only, e.g. I2CBUS.probe
+        if len(data) < 2:
+            raise OSError(EIO)
+        cmd = (data[0] << 8) | data[1]
+        if cmd == 0x0010:
+            if len(data) != 5 or calc_crc(data[2:4]) != data[4] or \
+                    data[2] not in (0x03, 0x05):
+                raise OSError(EIO)
+            self._format = data[2]
+            self._started = time.monotonic()
+            self._last_sample = 0
+        elif cmd == 0x0104:
+            self._started = None
+        elif cmd == 0xD304:
+            self._reset()
+        self._pointer = cmd
+
+    def frame(self):
+        values = tuple(self.mass) + tuple(self.counts) + (self.size,)
+        if self._format == 0x05:
+            values = values[:9] + (values[9] * 1000,)  # size in nm
+            return sensirion_words([max(0, min(0xFFFF, round(v))) for v in values])
+        return sensirion_bytes(pack(">10f", *values))
+
+    def read_into(self, buf):
+        ptr = self._pointer
+        if ptr == 0x0202:
+            ready = self._sample() > self._last_sample
+            data = sensirion_words((1 if ready else 0,))
+        elif ptr == 0x0300:
+            if self._started is None:
+                raise OSError(EIO)
+            self._last_sample = self._sample()
+            data = self.frame()
+            self.frames += 1
+        elif ptr == 0xD002:
+            data = sensirion_bytes(b"00080000")
+        elif ptr == 0xD033:
+            data = sensirion_bytes(b"SIM0123456789ABC")
+        elif ptr == 0xD100:
+            data = sensirion_bytes(b"\x02\x02")
+        elif ptr == 0xD206:
+            data = sensirion_words((0, 0))
+        else:
+            raise OSError(EIO)
+        n = min(len(buf), len(data))
+        buf[:n] = data[:n]
+        for i in range(n, len(buf)):
+            buf[i] = 0xFF
+
+
+def default_devices():
+    '''
+    topology used by I2CBUS when no devices are given, matches the
+    Test_*.py scripts: BME280 behind channel 1 of a PCA9548,
+    SDP810 and SPS30 directly on the bus
+    '''
+    mux = SimPCA9548(0x70)
+    mux.attach(1, SimBME280(0x76))
+    return [mux, SimSDP8XX(0x25), SimSPS30(0x69)]
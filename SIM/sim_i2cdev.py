@@ -0,0 +1,41 @@
+# Plays the kernel side of /dev/i2c-N for LINUX/i2c_core.py: the I2C_RDWR
+# messages are carried out on a simulated machine.I2C bus.
+#
+#   bus = I2CBUS(1, fd=0, ioctl=SimI2CDev().ioctl)
+from ctypes import addressof, memmove, string_at
+from errno import EINVAL, ENXIO
+import machine
+
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+
+
+class SimI2CDev():
+    '''
+    ioctl shim for I2CBUS(fd=..., ioctl=shim.ioctl), messages of one
+    call are separated by repeated STARTs like on the adapter
+    '''
+    def __init__(self, bus=None):
+        self.bus = machine.I2C(0) if bus is None else bus
+        self.calls = 0
+
+    def ioctl(self, fd, request, arg):
+        if request != I2C_RDWR:
+            raise OSError(EINVAL)
+        self.calls += 1
+        for i in range(arg.nmsgs):
+            msg = arg.msgs[i]
+            stop = i == arg.nmsgs - 1
+            try:
+                if msg.flags & I2C_M_RD:
+                    buf = bytearray(msg.len)
+                    self.bus.readfrom_into(msg.addr, buf, stop)
+                    if msg.len:
+                        memmove(addressof(msg.buf.contents), bytes(buf), msg.len)
+                else:
+                    data = string_at(msg.buf, msg.len) if msg.len else b""
+                    self.bus.writeto(msg.addr, data, stop)
+            except OSError:
+                # i2c-dev reports an address NAK as ENXIO
+                raise OSError(ENXIO, "No such device or address")
+        return 0
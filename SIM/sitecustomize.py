@@ -0,0 +1,2 @@
+# imported by CPython at startup when SIM is on PYTHONPATH
+import sim_compat
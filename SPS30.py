@@ -1,6 +1,14 @@
+import sys
 import time
+from array import array
 from i2c_core import *
+from sensirion_crc import calc_crc, check_words, chk_crc
+from measure_record import MeasureRecord
 from ustruct import unpack, unpack_from
+try:
+    from uctypes import addressof, bytearray_at
+except ImportError:
+    addressof = None
 
 START_MEASUREMENT_FLOAT = bytes.fromhex('00100300AC')
 START_MEASUREMENT_INT = bytes.fromhex('00100500F6')
@@ -20,62 +28,67 @@ SOFT_RST = bytes.fromhex('D304')
 
 SPS30_CLK_SPEED_HZ = 100_000;
 SPS30_I2C_ADDRESS = 0x69;
+STOP_MEASUREMENT_MS = const(20)  # execution time of Stop Measurement
 NUMBER_OF_MEASURES = 10;
+# Measures in frame order: key, unit, english and german label
+SPS30_MEASURES = (
+    ("massPM1", "µg/m³", "PM1.0 Mass", "PM1.0 Masse"),
+    ("massPM25", "µg/m³", "PM2.5 Mass", "PM2.5 Masse"),
+    ("massPM4", "µg/m³", "PM4.0 Mass", "PM4.0 Masse"),
+    ("massPM10", "µg/m³", "PM10 Mass", "PM10 Masse"),
+    ("partPM05", "#/cm³", "PM0.5 Count", "PM0.5 Anzahl"),
+    ("partPM1", "#/cm³", "PM1.0 Count", "PM1.0 Anzahl"),
+    ("partPM25", "#/cm³", "PM2.5 Count", "PM2.5 Anzahl"),
+    ("partPM4", "#/cm³", "PM4.0 Count", "PM4.0 Anzahl"),
+    ("partPM10", "#/cm³", "PM10 Count", "PM10 Anzahl"),
+    ("size", "µm", "typical size", "typische Größe"))
+MEASURE_KEYS = tuple(m[0] for m in SPS30_MEASURES)
+# integer format: µg/m³, #/cm³ and the typical size in nm
+_SIZE = const(9)
 
-def calc_crc(data):
+# fields of read(), the frame is read up to the last selected one
+MASS = const(1)     # massPM1 .. massPM10
+COUNTS = const(2)   # partPM05 .. partPM10
+SIZE = const(4)
+ALL = const(7)
+# number of leading values to read for each combination of fields
+FIELD_VALUES = (0, 4, 9, 9, 10, 10, 10, 10)
+
+def _float_frame_map(count):
     '''
-    calculates CRC-8 for 2 bytes
-    according Sensirion SDP8XX spec
-    Width: 8 bit
-    Polynom: 0x31
-    Init: 0xFF
-    no Reflects
-    Final XOR: 0x00 (none)
+    byte positions of count big endian floats inside a measurement frame
+    (every third byte is a CRC), ordered for the native float layout
     '''
-    crc = 0xFF
-    for value in data:
-        crc ^= value
-        for i in range(8):
-            if crc & (1 << 7):
-                crc = (crc << 1) ^ 0x31
+    fmap = bytearray(4 * count)
+    for k in range(count):
+        pos = (6*k, 6*k + 1, 6*k + 3, 6*k + 4)
+        for j in range(4):
+            if sys.byteorder == 'little':
+                fmap[4*k + j] = pos[3 - j]
             else:
-                crc = crc << 1
-            crc &= (1 << 8) - 1
-    return crc
-    
-def chk_crc(data):
+                fmap[4*k + j] = pos[j]
+    return bytes(fmap)
+
+FLOAT_FRAME_MAP = _float_frame_map(NUMBER_OF_MEASURES)
+
+def _byte_view(values):
     '''
-    Checks if crc of data is correct
-    two data bytes are followed by 1 CRC byte
+    writable byte view onto the storage of a float array
     '''
-    if len(data) % 3 == 0:
-        crc_correct = True
-        for i in range(0, len(data), 3):
-            if calc_crc(data[i:i+2]) != int(data[i+2]):
-                #print("{} {:02x}".format(data[i:i+3].hex(), calc_crc(data[i:i+2])))
-                crc_correct = False
-    else:
-        #print("length:", len(data), len(data) % 3)
-        crc_correct = False
-    return crc_correct
-        
+    if addressof is None:
+        return memoryview(values).cast('B')
+    return bytearray_at(addressof(values), len(values) * 4)
+
+
 class SPS30(I2CDEV):
     # creates variables
 
     DATA_FORMAT_FLOAT = True;
     DATA_FORMAT_INTEGER = False;
-    measures = {\
-        "massPM1" : [0.0, "µg/m³", "PM1.0 Mass", "PM1.0 Masse"],\
-        "massPM25" : [0.0, "µg/m³", "PM2.5 Mass", "PM2.5 Masse"],\
-        "massPM4" : [0.0, "µg/m³", "PM4.0 Mass", "PM4.0 Masse"],\
-        "massPM10" : [0.0, "µg/m³", "PM10 Mass", "PM10 Masse"],\
-        "partPM05" : [0.0, "#/cm³", "PM0.5 Count", "PM0.5 Anzahl"],\
-        "partPM1" : [0.0, "#/cm³", "PM1.0 Count", "PM1.0 Anzahl"],\
-        "partPM25" : [0.0, "#/cm³", "PM2.5 Count", "PM2.5 Anzahl"],\
-        "partPM4" : [0.0, "#/cm³", "PM4.0 Count", "PM4.0 Anzahl"],\
-        "partPM10" : [0.0, "#/cm³", "PM10 Count", "PM10 Anzahl"],\
-        "size" : [0.0, "µm", "typical size", "typische Größe"]}
     measuresValid = False
+    history = None  # optional history.History
+    # keys of measures, in record order
+    MEASURE_KEYS = MEASURE_KEYS
  
     def __init__(self,
                  address=SPS30_I2C_ADDRESS,
@@ -86,10 +99,26 @@ class SPS30(I2CDEV):
             raise ValueError('An I2C object is required.')
         self.i2c = i2c
         super().__init__(bus=i2c, dev_id=address, probe_on_bus=True)
+        # buffers which stay allocated for the decode path
+        self._frame = bytearray(6 * NUMBER_OF_MEASURES)
+        self._frame_mv = memoryview(self._frame)
+        # leading parts of the frame for each number of values
+        self._float_views = {}
+        self._int_views = {}
+        for n in FIELD_VALUES[1:]:
+            self._float_views[n] = self._frame_mv[0:6 * n]
+            self._int_views[n] = self._frame_mv[0:3 * n]
+        self._format = self.DATA_FORMAT_FLOAT
+        self._measuring = False
+        self.results = array("f", [0.0] * NUMBER_OF_MEASURES)
+        self.results_int = array("H", [0] * NUMBER_OF_MEASURES)
+        self._results_raw = _byte_view(self.results)
+        self.record = MeasureRecord(SPS30_MEASURES, self.results)
 
     def soft_reset(self):
         self.write(SOFT_RST)
         time.sleep(0.1)
+        self._measuring = False
         return
     
     def get_device_type(self):
@@ -100,6 +129,7 @@ class SPS30(I2CDEV):
             for i in range(0, len(answer), 3):
                 id += answer[i:i+2].decode()
         else:
+            self.crc_failed()
             id = None
         return id
         
@@ -111,6 +141,7 @@ class SPS30(I2CDEV):
             for i in range(0, len(answer), 3):
                 sn += answer[i:i+2].decode()
         else:
+            self.crc_failed()
             sn = None
         return sn
         
@@ -122,6 +153,7 @@ class SPS30(I2CDEV):
             major, minor = unpack(">BBx", answer)
             sn = "{}.{}".format(major, minor)
         else:
+            self.crc_failed()
             sn = None
         return sn
         
@@ -132,6 +164,7 @@ class SPS30(I2CDEV):
             major, minor = unpack(">hxhx", answer)
             status = major << 16 + minor
         else:
+            self.crc_failed()
             status = None
         return status
         
@@ -142,20 +175,109 @@ class SPS30(I2CDEV):
         if chk_crc(answer):
             return (answer[1] == 1)
         else:
+            self.crc_failed()
             return False
         
-    def start_measurement(self):
-        self.write(START_MEASUREMENT_FLOAT)
+    def start_measurement(self, format=DATA_FORMAT_FLOAT):
+        '''
+        format DATA_FORMAT_FLOAT (big endian floats, 60 byte frames) or
+        DATA_FORMAT_INTEGER (unsigned 16 bit, 30 byte frames).
+        The sensor ignores the start while it measures, a running
+        measurement is stopped first so the new format takes effect
+        '''
+        if self._measuring:
+            self.stop_measurement()
+        self._start_cmd(format)
         return
 
+    def _start_cmd(self, format):
+        if format == self.DATA_FORMAT_INTEGER:
+            self.write(START_MEASUREMENT_INT)
+        else:
+            self.write(START_MEASUREMENT_FLOAT)
+        self._format = format
+        self._measuring = True
+
+    @property
+    def data_format(self):
+        '''
+        format of the running measurement, read_values decodes it
+        '''
+        return self._format
+
     def stop_measurement(self):
-        self.write(STOP_MEASUREMENT)
+        self._stop_cmd()
+        time.sleep_ms(STOP_MEASUREMENT_MS)
         return
+
+    def _stop_cmd(self):
+        # the sensor takes STOP_MEASUREMENT_MS to execute it
+        self.write(STOP_MEASUREMENT)
+        self._measuring = False
  
     def start_fan_cleaning(self):
         self.write(START_FAN_CLEANING)
         return
     
+    def read_values(self, fields=ALL):
+        '''
+        reads sensor data without allocating heap memory, in the order
+        of MEASURE_KEYS into self.results in float format or into
+        self.results_int in integer format. With fields (MASS, COUNTS,
+        SIZE or'ed) the read ends after the last selected value, only the
+        values up to there are updated.
+        returns True if the CRC of all words is correct
+        '''
+        if not 0 < fields <= ALL:
+            raise ValueError("fields must be MASS, COUNTS, SIZE or a "
+                             "combination of them, got {}".format(fields))
+        n = FIELD_VALUES[fields]
+        if self._format == self.DATA_FORMAT_INTEGER:
+            return self._read_int(n)
+        mv = self._float_views[n]
+        self.write_read_into(READ_MEASURED_VALUES, mv)
+        if check_words(mv) >= 0:
+            self.crc_failed()
+            return False
+        # strip the CRC bytes and swap to native order in one pass
+        frame = self._frame
+        raw = self._results_raw
+        fmap = FLOAT_FRAME_MAP
+        for i in range(4 * n):
+            raw[i] = frame[fmap[i]]
+        return True
+
+    def _read_int(self, n):
+        mv = self._int_views[n]
+        self.write_read_into(READ_MEASURED_VALUES, mv)
+        if check_words(mv) >= 0:
+            self.crc_failed()
+            return False
+        frame = self._frame
+        ints = self.results_int
+        for i in range(n):
+            ints[i] = (frame[3*i] << 8) | frame[3*i + 1]
+        return True
+
+    def value_int(self, key):
+        '''
+        integer value of the last read in integer format:
+        µg/m³, #/cm³ or nm for the size
+        '''
+        return self.results_int[MEASURE_KEYS.index(key)]
+
+    def value_fixed(self, key, shift=8):
+        '''
+        value of the last read as a fixed point integer with shift
+        fractional bits, in the units of measures, in both formats
+        '''
+        i = MEASURE_KEYS.index(key)
+        if self._format == self.DATA_FORMAT_INTEGER:
+            if i == _SIZE:
+                return (self.results_int[i] << shift) // 1000
+            return self.results_int[i] << shift
+        return int(self.results[i] * (1 << shift))
+
     def ReadAllMeasures(self):
     
         '''
@@ -163,27 +285,35 @@ class SPS30(I2CDEV):
         checks CRC of data and
         stores calculated data into measures
         '''
-        self.measuresValid = False
-        answer = bytearray(60)
-        self.write_read_into(READ_MEASURED_VALUES, memoryview(answer))
-        #print("answer: ")
-        #print(answer.hex().upper())
-        if chk_crc(answer):
-            data = bytearray(b'')
-            for i in range(0, len(answer), 3):
-                data += answer[i:i+2]
-            #print("data: ")
-            #print(data.hex().upper())
-            i = 0
-            for key in ("massPM1","massPM25","massPM4","massPM10"):
-                #print(unpack_from(">f", data, i))
-                self.measures[key][0] = unpack_from(">f", data, i)[0]
-                i += 4
-            for key in ("partPM05","partPM1","partPM25","partPM4","partPM10"):
-                #print(unpack_from(">f", data, i))
-                self.measures[key][0] = unpack_from(">f", data, i)[0]
-                i += 4
-            self.measures["size"][0] = unpack_from(">f", data, i)[0]
+        self.read_fields(ALL)
         return
-            
- 
\ No newline at end of file
+
+    def read_fields(self, fields=ALL):
+        '''
+        ReadAllMeasures for the selected fields only, e.g. read_fields(MASS)
+        transfers 24 instead of 60 bytes. The other measures keep
+        their values, history is only recorded for complete reads
+        '''
+        self.measuresValid = self.read_values(fields)
+        if not self.measuresValid:
+            return False
+        n = FIELD_VALUES[fields]
+        if self._format == self.DATA_FORMAT_INTEGER:
+            results = self.results
+            ints = self.results_int
+            for i in range(n):
+                results[i] = ints[i]
+            if n > _SIZE:
+                results[_SIZE] = ints[_SIZE] / 1000  # nm to µm
+        if n == NUMBER_OF_MEASURES and self.history is not None:
+            self.history.record(self)
+        return True
+
+    @property
+    def measures(self):
+        '''
+        {key: [value, unit, label_en, label_de]} view of record, read
+        only: it is refreshed from record on every access, changes to it
+        are lost, set values with record.set(key, value)
+        '''
+        return self.record.view()
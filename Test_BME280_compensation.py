@@ -0,0 +1,60 @@
+# Cross-check of the float and integer compensation engines of the BME280
+# driver over a sweep of raw values. Runs without a sensor.
+from ustruct import pack
+from array import array
+from BME280 import *
+
+# typical calibration values of a BME280
+dig_T = (27504, 26435, -1000)
+dig_P = (36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000)
+dig_H1, dig_H2, dig_H3, dig_H4, dig_H5, dig_H6 = 75, 362, 0, 313, 50, 30
+
+calib_88 = pack("<HhhHhhhhhhhhBB", *(dig_T + dig_P + (0, dig_H1)))
+calib_e1 = pack("<hBbBBb", dig_H2, dig_H3, dig_H4 >> 4,
+                ((dig_H5 & 0xF) << 4) | (dig_H4 & 0xF), dig_H5 >> 4, dig_H6)
+
+# datasheet resolutions of the outputs, which the engines must agree within
+TOL_TEMP = 0.01     # °C
+TOL_PRESS = 1.0     # Pa
+TOL_HUM = 0.01      # %
+
+bme = BME280.__new__(BME280)
+bme.set_calibration(calib_88, calib_e1)
+
+result = array("i", [0, 0, 0])
+worst = [0.0, 0.0, 0.0]
+count = 0
+for raw_temp in range(350000, 650001, 25000):
+    for raw_press in range(250000, 450001, 20000):
+        for raw_hum in range(20000, 45001, 2500):
+            t, p, h = bme.compensate_float(raw_temp, raw_press, raw_hum)
+            bme.compensate_int(raw_temp, raw_press, raw_hum, result)
+            for i, diff in enumerate((abs(t - result[0] / 100),
+                                      abs(p - result[1] / 256),
+                                      abs(h - result[2] / 1024))):
+                worst[i] = max(worst[i], diff)
+            count += 1
+
+print("samples:", count)
+print("max deviation temperature: {:.4f} °C".format(worst[0]))
+print("max deviation pressure   : {:.4f} Pa".format(worst[1]))
+print("max deviation humidity   : {:.4f} %".format(worst[2]))
+ok = worst[0] <= TOL_TEMP and worst[1] <= TOL_PRESS and worst[2] <= TOL_HUM
+print("PASS" if ok else "FAIL")
+
+# bulk compensation of the same sweep must match compensate_float
+import batch_compensation
+raw = array("i")
+ref = []
+for raw_temp in range(350000, 650001, 25000):
+    for raw_press in range(250000, 450001, 20000):
+        raw.extend((raw_temp, raw_press, 30000))
+        ref.extend(bme.compensate_float(raw_temp, raw_press, 30000))
+out = batch_compensation.bme280(bme, raw)
+if batch_compensation.np is not None:
+    out = out.flatten()
+# a flat array('f') without ulab and NumPy, float32 resolution
+worst = max(abs(out[i] - ref[i]) / max(1.0, abs(ref[i])) for i in range(len(ref)))
+print("batch samples:", len(ref) // 3)
+print("batch max relative deviation: {:.2e}".format(worst))
+print("PASS" if worst < 1e-6 else "FAIL")
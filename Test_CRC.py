@@ -0,0 +1,55 @@
+from time import ticks_us, ticks_diff
+from sensirion_crc import calc_crc, check_words, chk_crc
+
+# bit-by-bit implementation the drivers used before sensirion_crc
+def calc_crc_bitwise(data):
+    crc = 0xFF
+    for value in data:
+        crc ^= value
+        for i in range(8):
+            if crc & (1 << 7):
+                crc = (crc << 1) ^ 0x31
+            else:
+                crc = crc << 1
+            crc &= (1 << 8) - 1
+    return crc
+
+def chk_crc_bitwise(data):
+    if len(data) % 3 == 0:
+        crc_correct = True
+        for i in range(0, len(data), 3):
+            if calc_crc_bitwise(data[i:i+2]) != int(data[i+2]):
+                crc_correct = False
+    else:
+        crc_correct = False
+    return crc_correct
+
+# example from the Sensirion datasheets
+print("CRC(0xBEEF) = 0x{:02X} (expected 0x92)".format(calc_crc(b'\xBE\xEF')))
+
+# SPS30 sized frame: 20 words with valid CRC
+frame = bytearray(60)
+for i in range(0, 60, 3):
+    frame[i] = i
+    frame[i+1] = 255 - i
+    frame[i+2] = calc_crc_bitwise(frame[i:i+2])
+mv = memoryview(frame)
+
+print("frame ok:", chk_crc_bitwise(frame), chk_crc(mv), check_words(mv))
+frame[31] ^= 0x01
+print("bad word:", check_words(mv), "(expected 10)")
+frame[31] ^= 0x01
+
+LOOPS = 200
+
+def bench(name, func, arg):
+    start = ticks_us()
+    for _ in range(LOOPS):
+        func(arg)
+    us = ticks_diff(ticks_us(), start) / LOOPS
+    print("{:<10}: {:8.1f} us per 60 byte frame".format(name, us))
+    return us
+
+old = bench("bitwise", chk_crc_bitwise, frame)
+new = bench("table", check_words, mv)
+print("speedup   : {:8.1f} x".format(old / new))
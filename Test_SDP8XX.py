@@ -26,4 +26,19 @@ for i in range(10):
     airspeed.ReadAllMeasures()
     for y in airspeed.measures.values():
         print("{:15}: {:4.2f} {}".format(y[3], y[0], y[1]))
-    print(airspeed.values)
\ No newline at end of file
+    print(airspeed.values)
+# pressure only reads, a full read every airspeed.full_every samples
+for i in range(5):
+    print("{:.2f} Pa".format(airspeed.read_pressure()))
+
+# 2 kHz capture into preallocated blocks
+from array import array
+from time import ticks_diff
+samples = array('h', [0] * 200)
+times = array('l', [0] * 200)
+def block_done(samples, times, scale):
+    pa = airspeed.to_pascal(samples, scale)
+    rate = 1000_000 * (len(times) - 1) / ticks_diff(times[-1], times[0])
+    print("block: {:6.2f} Pa mean, {:6.0f} samples/s".format(sum(pa) / len(pa), rate))
+airspeed.capture(samples, times, block_done, 4, period_us=500)
+airspeed.stop_cont_meas()
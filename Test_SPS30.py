@@ -26,6 +26,21 @@ print("Status:", "{:08x}".format(sps.get_device_status()))
 
 sps.start_measurement()
 
+# steady state heap usage of the decode path, must print 0 on the board.
+# Under the simulator the temporaries of CPython itself (range iterators,
+# bound methods) and of the simulated bus are counted as well
+import gc
+while not sps.measurement_results_ready():
+    sleep(0.1)
+sps.read_values()
+gc.collect()
+allocated = 0
+for i in range(20):
+    before = gc.mem_alloc()
+    sps.read_values()
+    allocated += gc.mem_alloc() - before
+print("Bytes allocated by 20 read_values():", allocated)
+
 for i in range(100):
     sleep(10)
     while not sps.measurement_results_ready():
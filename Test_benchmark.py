@@ -0,0 +1,108 @@
+from i2c_core import I2CDEV, I2CBUS
+from time import sleep, sleep_ms
+from array import array
+from pca9548 import *
+from bme280 import *
+from sdp8XX import *
+from sps30 import *
+from bench import Bench, load, regressions
+
+from board import HW_DEFS
+hw = HW_DEFS()
+
+# files of the run go to OUT_DIR: the temp dir on CPython, the current
+# directory on the board
+try:
+    from tempfile import gettempdir
+    OUT_DIR = gettempdir() + "/"
+except ImportError:
+    OUT_DIR = ""
+# figures of this run go to BENCH_FILE, compared with BENCH_BASE if present
+BENCH_FILE = OUT_DIR + "bench.json"
+BENCH_BASE = "bench_base.json"
+
+i2c0 = I2CBUS(hw.PORT, scl=hw.SCL, sda=hw.SDA, freq=100_000)
+
+print(i2c0)
+
+i2cmux = PCA9548(i2c=i2c0)
+bench = Bench(i2c0, iterations=20)
+
+# BME280 behind channel 1 of the mux
+bme280 = BME280(i2c=i2cmux.channel(1), altitude=54.0)
+bme280.start_measurement()
+bench.add("bme280_forced", bme280.ReadAllMeasures)
+bme280.start_continuous()
+sleep_ms(100)
+bench.add("bme280_normal", bme280.ReadAllMeasures)
+# temperature, pressure and humidity only, into a preallocated array
+tph = array("f", (0.0, 0.0, 0.0))
+bench.add("bme280_read_tph_into", lambda: bme280.read_tph_into(tph))
+bme280.stop_continuous()
+# calibration at startup: read from the NVM or from the cache file
+bench.add("bme280_calibration", bme280.load_calibration)
+bme280.cal_cache = OUT_DIR + "bme280_cal.txt"
+bme280.load_calibration()
+bench.add("bme280_calibration_cached", bme280.load_calibration)
+bme280.cal_cache = None
+# compensation alone, no bus traffic
+bench.add("bme280_compensate", lambda: bme280.compensate_float(519888, 415148, 27000))
+
+sdp = SDP8XX(i2c=i2c0)
+sdp.soft_reset()
+bench.add("sdp8xx_device_type", sdp.get_device_type)
+sdp.start_cont_meas(sdp.MODE_DP, True)
+sleep_ms(20)
+bench.add("sdp8xx_continuous", sdp.ReadAllMeasures)
+bench.add("sdp8xx_pressure_only", sdp.read_pressure, iterations=sdp.full_every)
+sdp.stop_cont_meas()
+
+sps = SPS30(i2c=i2c0)
+sps.start_measurement()
+while not sps.measurement_results_ready():
+    sleep(0.1)
+bench.add("sps30_frame", sps.ReadAllMeasures)
+bench.add("sps30_mass_only", lambda: sps.read_fields(MASS))
+sps.enable_metrics()
+bench.add("sps30_frame_metrics", sps.ReadAllMeasures)
+sps.disable_metrics()
+sps.stop_measurement()
+sps.start_measurement(sps.DATA_FORMAT_INTEGER)
+while not sps.measurement_results_ready():
+    sleep(0.1)
+bench.add("sps30_frame_int", sps.ReadAllMeasures)
+sps.stop_measurement()
+
+# alternating channels, each call writes the control register
+channels = [1, 2]
+def switch():
+    channels.reverse()
+    i2cmux.enable(channels[0])
+bench.add("pca9548_switch", switch)
+# same channel again, answered from the cached mask
+bench.add("pca9548_reselect", lambda: i2cmux.enable(1))
+
+i2cmux.disable()
+present = I2CDEV(bus=i2c0, dev_id=SPS30_I2C_ADDRESS, probe_on_bus=False)
+missing = I2CDEV(bus=i2c0, dev_id=0x50, probe_on_bus=False)
+bench.add("i2cdev_probe", present.probe)
+bench.add("i2cdev_probe_missing", missing.probe)
+# looked up at each call, the counter wraps the methods of i2c0
+bench.add("i2cbus_scan", lambda: i2c0.scan(), iterations=2)
+
+for name, r in bench.results.items():
+    print("{:<22} {:5.1f} transfers {:6.1f} bytes {:8.1f} µs@100kHz {:8.1f} µs@400kHz {:6.1f} B alloc {:9.1f} µs".format(
+        name, r["transfers"], r["bytes_written"] + r["bytes_read"],
+        r["bus_time_us"]["100kHz"], r["bus_time_us"]["400kHz"],
+        r["alloc_bytes"], r["wall_us"]))
+
+print(bench.dumps())
+bench.save(BENCH_FILE)
+
+try:
+    base = load(BENCH_BASE)
+except OSError:
+    base = None
+if base is not None:
+    for name, field, old, new in regressions(base, bench.report()):
+        print("REGRESSION {} {}: {} -> {}".format(name, field, old, new))
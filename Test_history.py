@@ -0,0 +1,35 @@
+# History of driver values, float and integer storage. Runs without a sensor.
+from history import History
+from measure_record import MeasureRecord
+
+META = (("temp", "°C", "Temperature", "Temperatur"),
+        ("humi", "%", "Humidity", "Luftfeuchte"))
+
+class FakeSensor():
+    # record with float values like the drivers after ReadAllMeasures
+    def __init__(self):
+        self.record = MeasureRecord(META)
+
+sensor = FakeSensor()
+levels = ((10, 0), (10, 1000))
+hist_f = History(("temp", "humi"), levels)
+hist_i = History(("temp", "humi"), levels, typecode="i")
+
+ok = True
+for i in range(25):
+    sensor.record.values[0] = 20.5 + i * 0.1
+    sensor.record.values[1] = 45.25
+    hist_f.record(sensor, t=i * 100)
+    hist_i.record(sensor, t=i * 100)
+
+raw_f = hist_f["temp"].raw
+raw_i = hist_i["temp"].raw
+print("float raw latest: {:.2f}".format(raw_f.latest()))
+print("int raw latest  :", raw_i.latest())
+ok = ok and abs(raw_f.latest() - 22.9) < 1e-4 and raw_i.latest() == 22
+ok = ok and hist_i["humi"].raw.latest() == 45
+# two complete 1 s buckets, mean of the integer values
+means = [value for t, value in hist_i["temp"][1].items()]
+print("int bucket means:", means)
+ok = ok and means == [20, 21]
+print("PASS" if ok else "FAIL")
@@ -0,0 +1,33 @@
+# BME280 behind the PCA9548 through the Linux i2c-dev backend, the
+# kernel side is played by SIM/sim_i2cdev.py. Runs without hardware:
+#   PYTHONPATH=LINUX:CPYTHON:SIM:. python3 Test_linux_i2c.py
+from i2c_core import I2CBUS
+from bme280 import *
+from pca9548 import *
+from sim_i2cdev import SimI2CDev
+
+kernel = SimI2CDev()
+i2c0 = I2CBUS(0, fd=0, ioctl=kernel.ioctl)
+print(i2c0)
+
+i2cmux = PCA9548(i2c=i2c0)
+bme280 = BME280(i2c=i2cmux.channel(1), altitude=54.0)
+bme280.start_measurement()
+
+ok = bme280.detected
+calls = kernel.calls
+bme280.read_mem(BME280_REGISTER_CHIPID, 1)
+# register address and data in one I2C_RDWR call
+ok = ok and kernel.calls == calls + 1
+
+bme280.ReadAllMeasures()
+for y in bme280.measures.values():
+    print("{}: {:.2f} {}".format(y[3], y[0], y[1]))
+ok = ok and abs(bme280.temperature - 21.0) < 0.01
+ok = ok and abs(bme280.pressure - 1013.25) < 0.01
+ok = ok and abs(bme280.humidity - 45.0) < 0.01
+
+# an address nobody answers is a NAK, reported as ENXIO
+ok = ok and not i2c0.probe(0x50)
+print("ioctl calls:", kernel.calls)
+print("PASS" if ok else "FAIL")
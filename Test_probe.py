@@ -0,0 +1,38 @@
+from i2c_core import I2CDEV, I2CBUS
+from time import ticks_us, ticks_diff
+from pca9548 import *
+
+from board import HW_DEFS
+hw = HW_DEFS()
+
+i2c0 = I2CBUS(hw.PORT, scl=hw.SCL, sda=hw.SDA, freq=100_000)
+
+print(i2c0)
+
+i2cmux = PCA9548(i2c=i2c0)
+
+# boot time of 20 devices, 0x76 (BME280) on every mux channel
+# and a few addresses which don't answer
+devices = [(ch, 0x76) for ch in range(1, 9)] + \
+          [(ch, 0x25) for ch in range(1, 9)] + \
+          [(ch, 0x69) for ch in range(1, 5)]
+
+start = ticks_us()
+found_scan = 0
+for ch, addr in devices:
+    i2cmux.enable(ch)
+    if addr in i2c0.scan():
+        found_scan += 1
+t_scan = ticks_diff(ticks_us(), start)
+
+start = ticks_us()
+found_probe = 0
+for ch, addr in devices:
+    if I2CDEV(bus=i2cmux.channel(ch), dev_id=addr).detected:
+        found_probe += 1
+t_probe = ticks_diff(ticks_us(), start)
+
+print("full scan per device: {:8.1f} ms, {} found".format(t_scan / 1000, found_scan))
+print("targeted probe      : {:8.1f} ms, {} found".format(t_probe / 1000, found_probe))
+
+i2cmux.disable()
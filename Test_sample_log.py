@@ -0,0 +1,85 @@
+from i2c_core import I2CDEV, I2CBUS
+from bme280 import *
+from pca9548 import *
+from sample_log import SampleLogWriter, SampleLog, device_meta, FLAG_CRC_ERROR
+from array import array
+from time import sleep_ms
+try:
+    from tempfile import gettempdir
+    LOG_DIR = gettempdir() + "/"
+except ImportError:
+    LOG_DIR = ""  # current directory on the board
+try:
+    import mmap
+except ImportError:
+    mmap = None  # reading is done on the PC
+
+from board import HW_DEFS
+hw = HW_DEFS()
+
+i2c0 = I2CBUS(hw.PORT, scl=hw.SCL, sda=hw.SDA, freq=100_000)
+i2cmux = PCA9548(i2c=i2c0)
+
+bme280 = BME280(i2c=i2cmux.channel(1), altitude=54.0)
+bme280.start_measurement()
+ok = True
+
+# round trip: 3 values and a 20 byte record, so records 25, 51, ...
+# span two 512 byte blocks, flushes in between: twice in one block and
+# once in the block of the record 76 across the boundary
+N = 120
+FLUSH_AT = (60, 61, 76)
+values = array("f", (0.0, 0.0, 0.0))
+with SampleLogWriter(LOG_DIR + "roundtrip.log", [device_meta(bme280), {"type": "test"}], 3) as log:
+    for i in range(N):
+        values[0] = i
+        values[1] = i * 0.5
+        values[2] = -i
+        log.write(i % 2, values, flags=FLAG_CRC_ERROR if i == 7 else 0, t=10 * i)
+        if i in FLUSH_AT:
+            log.flush()
+    ok = ok and log.records == N
+
+# compensated temperature, pressure and humidity of the sensor
+tph = array("f", (0.0, 0.0, 0.0))
+with SampleLogWriter(LOG_DIR + "bme280.log", [device_meta(bme280, "outdoor")], 3) as log:
+    for i in range(20):
+        log.write(0, bme280.read_tph_into(tph))
+        sleep_ms(10)
+
+# raw values, to be compensated later, see batch_compensation
+raw = array("i", (0, 0, 0))
+with SampleLogWriter(LOG_DIR + "bme280_raw.log", [device_meta(bme280)], 3, typecode="i") as log:
+    for i in range(20):
+        bme280.read_raw_data(raw)
+        log.write(0, raw)
+
+if mmap is not None:
+    with SampleLog(LOG_DIR + "roundtrip.log") as log:
+        print("round trip:", len(log), "records")
+        ok = ok and len(log) == N and log.header_len % 512 == 0
+        ok = ok and len(log._mm) == log.header_len + N * log.record_size
+        ok = ok and log.devices[1] == {"type": "test"}
+        ok = ok and list(log.times) == [10 * i for i in range(N)]
+        ok = ok and list(log.device) == [i % 2 for i in range(N)]
+        ok = ok and [i for i, f in enumerate(log.flags) if f] == [7]
+        ok = ok and list(log.column(0)) == [float(i) for i in range(N)]
+        ok = ok and list(log.column(1)) == [i * 0.5 for i in range(N)]
+        ok = ok and list(log.column(2)) == [float(-i) for i in range(N)]
+    with SampleLog(LOG_DIR + "bme280.log") as log:
+        temp = log.column(0)
+        print(len(log), "records of", log.devices)
+        print("temperature {:.2f} .. {:.2f} °C".format(min(temp), max(temp)))
+        ok = ok and len(log) == 20 and abs(temp[0] - 21.0) < 0.01
+        ok = ok and log.times[-1] > log.times[0]
+    with SampleLog(LOG_DIR + "bme280_raw.log") as log:
+        import batch_compensation
+        calib = bytes.fromhex(log.devices[0]["calibration"])
+        bme = BME280.__new__(BME280)
+        bme.set_calibration(calib[0:26], calib[26:33])
+        t = batch_compensation.bme280(bme, (log.column(0)[0], log.column(1)[0], log.column(2)[0]))[0]
+        if batch_compensation.np is not None:
+            t = t[0]
+        print("raw temperature", log.column(0)[0], "-> {:.2f} °C".format(t))
+        ok = ok and log.typecode == "i" and abs(t - 21.0) < 0.01
+print("PASS" if ok else "FAIL")
@@ -0,0 +1,135 @@
+import time
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+from BME280 import BME280, BME280_TIMEOUT, MODE_FORCED, MODE_NORMAL
+from SDP8XX import SDP8XX
+from SPS30 import SPS30, SOFT_RST, STOP_MEASUREMENT_MS
+
+if hasattr(asyncio, "sleep_ms"):
+    sleep_ms = asyncio.sleep_ms
+else:
+    def sleep_ms(ms):
+        return asyncio.sleep(ms / 1000)
+
+SDP8XX_FIRST_MEAS_MS = 8   # first result of continuous mode is ready after 8 ms
+
+
+class AsyncBME280(BME280):
+    '''
+    BME280 whose waits yield to the event loop,
+    so several sensors can convert at the same time
+    '''
+
+    async def collect_async(self, result):
+        """ Awaits the conversion started by trigger and reads
+            the raw data.
+
+            Args:
+                result: array of length 3 or alike where the result will be
+                stored, in temperature, pressure, humidity order
+        """
+        if self.deadline is None:
+            self.trigger()
+        if self._op_mode != MODE_NORMAL:
+            wait = time.ticks_diff(self.deadline, time.ticks_us())
+            if wait > 0:
+                await sleep_ms((wait + 999) // 1000)
+            for _ in range(BME280_TIMEOUT):
+                if not self.busy():
+                    break  # Sensor ready
+                await sleep_ms(1)  # still busy
+            else:
+                raise RuntimeError("Sensor BME280 not ready")
+        self._deadline = None
+        self.read_burst(result)
+
+    async def read_raw(self, result):
+        """ awaitable counterpart of read_raw_data, collects a conversion
+            already started by trigger instead of starting another one
+        """
+        if self._op_mode == MODE_FORCED and self.deadline is None:
+            self.trigger()
+        await self.collect_async(result)
+
+    async def read_all(self, result=None):
+        """ awaitable counterpart of ReadAllMeasures, of read_tph_into
+            if result is given
+        """
+        await self.read_raw(self._l3_resultarray)
+        return self.update_measures(self._l3_resultarray, result)
+
+
+class AsyncSDP8XX(SDP8XX):
+    '''
+    SDP8XX whose waits yield to the event loop
+    '''
+
+    async def soft_reset_async(self):
+        """ awaitable counterpart of soft_reset """
+        self.i2c.writeto(0, bytes.fromhex('06'))
+        await sleep_ms(100)
+        return
+
+    async def start_cont_meas_async(self, mode:bool, averaging:bool):
+        """ starts continuous mode and awaits the first result """
+        self.start_cont_meas(mode, averaging)
+        await sleep_ms(SDP8XX_FIRST_MEAS_MS)
+        return
+
+    async def read_all(self):
+        """ awaitable counterpart of ReadAllMeasures """
+        await sleep_ms(0)
+        self.ReadAllMeasures()
+        return self.measuresValid
+
+
+class AsyncSPS30(SPS30):
+    '''
+    SPS30 whose waits yield to the event loop
+    '''
+
+    async def soft_reset_async(self):
+        """ awaitable counterpart of soft_reset """
+        self.write(SOFT_RST)
+        self._measuring = False
+        await sleep_ms(100)
+        return
+
+    async def start_measurement_async(self, format=SPS30.DATA_FORMAT_FLOAT):
+        """ awaitable counterpart of start_measurement """
+        if self._measuring:
+            await self.stop_measurement_async()
+        self._start_cmd(format)
+        return
+
+    async def stop_measurement_async(self):
+        """ awaitable counterpart of stop_measurement """
+        self._stop_cmd()
+        await sleep_ms(STOP_MEASUREMENT_MS)
+        return
+
+    async def wait_ready(self, poll_ms=100, timeout_ms=None):
+        """ Awaits the data ready flag.
+
+            Args:
+                poll_ms: interval between two polls of the flag
+                timeout_ms: raises RuntimeError after this time, waits
+                forever if None
+        """
+        start = time.ticks_ms()
+        while not self.measurement_results_ready():
+            if timeout_ms is not None and \
+                    time.ticks_diff(time.ticks_ms(), start) >= timeout_ms:
+                raise RuntimeError("Sensor SPS30 not ready")
+            await sleep_ms(poll_ms)
+        return
+
+    async def read_all(self, poll_ms=100, timeout_ms=None):
+        """ awaitable counterpart of ReadAllMeasures,
+            waits for new data first
+        """
+        await self.wait_ready(poll_ms, timeout_ms)
+        self.ReadAllMeasures()
+        return self.measuresValid
@@ -0,0 +1,152 @@
+# Compensation of stored raw samples in bulk: BME280 read_raw_data
+# triples, SDP8XX raw pressure words and SPS30 measurement frames.
+# Vectorized with ulab on MicroPython and NumPy on CPython, plain
+# loops over array('f') if neither is available.
+from array import array
+from SDP8XX import SDP8XX
+from SPS30 import FLOAT_FRAME_MAP, NUMBER_OF_MEASURES, _byte_view
+from sensirion_crc import CRC8_TABLE, check_words
+try:
+    from ulab import numpy as np
+    _ULAB = True
+except ImportError:
+    _ULAB = False
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+if np is not None:
+    _FLOAT = np.float if _ULAB else np.float64
+
+_NAN = float("nan")
+_SPS30_SIZE = NUMBER_OF_MEASURES - 1
+
+
+def bme280(sensor, raw, out=None):
+    '''
+    temperature (°C), pressure (Pa) and humidity (%) of raw samples with
+    the calibration of sensor (a BME280 after start_measurement or
+    set_calibration), the maths of compensate_float.
+    raw: n x 3 array, or a flat sequence of triples as filled by
+    read_raw_data. Returns an n x 3 array, with neither ulab nor NumPy
+    a flat array('f') of triples (out if given)
+    '''
+    if np is None:
+        return _bme280_loop(sensor, raw, out)
+    T1_1024, T1_8192, T2, T3, P1, P2, P3_524288, P4_65536, P5_2, \
+        P6_32768, P7, P8_32768, P9_2147483648, H1_524288, H2_65536, \
+        H3_67108864, H4_64, H5_16384, H6_67108864 = sensor._coef
+    raw = np.array(raw, dtype=_FLOAT)
+    if raw.ndim == 1:
+        raw = raw.reshape((len(raw) // 3, 3))
+    raw_temp = raw[:, 0]
+    raw_press = raw[:, 1]
+    raw_hum = raw[:, 2]
+    if out is None:
+        out = np.zeros(raw.shape, dtype=_FLOAT)
+
+    # temperature, t_fine truncated to int like self.t_fine
+    var2 = raw_temp / 131072.0 - T1_8192
+    t_fine = (raw_temp / 16384.0 - T1_1024) * T2 + var2 * var2 * T3
+    out[:, 0] = np.clip(t_fine / 5120.0, -40, 85)
+    t_fine = np.where(t_fine < 0, np.ceil(t_fine), np.floor(t_fine))
+
+    # pressure
+    var1 = t_fine / 2.0 - 64000.0
+    var2 = var1 * var1 * P6_32768 + var1 * P5_2
+    var2 = var2 / 4.0 + P4_65536
+    var1 = (P3_524288 * var1 * var1 + P2 * var1) / 524288.0
+    var1 = (1.0 + var1 / 32768.0) * P1
+    zero = var1 == 0.0
+    p = ((1048576.0 - raw_press) - var2 / 4096.0) * 6250.0 / \
+        np.where(zero, 1.0, var1)
+    p = p + (P9_2147483648 * p * p + p * P8_32768 + P7) / 16.0
+    out[:, 1] = np.where(zero, 30000.0, np.clip(p, 30000, 110000))
+
+    # humidity
+    h = t_fine - 76800.0
+    h = (raw_hum - (H4_64 + H5_16384 * h)) * \
+        (H2_65536 * (1.0 + H6_67108864 * h * (1.0 + H3_67108864 * h)))
+    out[:, 2] = np.clip(h * (1.0 - H1_524288 * h), 0, 100)
+    return out
+
+def _bme280_loop(sensor, raw, out):
+    n = len(raw) // 3
+    if out is None:
+        out = array("f", [0.0] * (3 * n))
+    compensate = sensor.compensate_float
+    t_fine = sensor.t_fine
+    for i in range(0, 3 * n, 3):
+        out[i], out[i + 1], out[i + 2] = \
+            compensate(raw[i], raw[i + 1], raw[i + 2])
+    sensor.t_fine = t_fine
+    return out
+
+
+def sdp8xx(samples, scale, out=None):
+    '''
+    raw differential pressure words (int16, e.g. blocks of SDP8XX.stream)
+    to Pa, scale as yielded by stream or SDP8XX_SCALES
+    '''
+    if np is None:
+        return SDP8XX.to_pascal(samples, scale, out)
+    if out is None:
+        return np.array(samples, dtype=_FLOAT) / scale
+    out[:] = np.array(samples, dtype=_FLOAT) / scale
+    return out
+
+
+def sps30(frames, integer=False, out=None):
+    '''
+    measures of SPS30 frames in the order of MEASURE_KEYS, the size
+    in µm in both formats. frames: bytes of complete frames one after
+    the other, 60 bytes each in float and 30 in integer format.
+    Frames with a CRC error give NaN values.
+    Returns an n x 10 array, with neither ulab nor NumPy a flat
+    array('f') (out if given)
+    '''
+    if np is None or _ULAB:
+        # ulab has no fancy indexing for the CRC table or byte order views
+        return _sps30_loop(frames, integer, out)
+    words = np.frombuffer(frames, dtype=np.uint8).reshape((-1, 3))
+    table = np.frombuffer(CRC8_TABLE, dtype=np.uint8)
+    crc = table[table[0xFF ^ words[:, 0]] ^ words[:, 1]]
+    per_frame = NUMBER_OF_MEASURES if integer else 2 * NUMBER_OF_MEASURES
+    good = (crc == words[:, 2]).reshape((-1, per_frame)).all(axis=1)
+    data = np.ascontiguousarray(words[:, 0:2]).reshape((-1, 2 * per_frame))
+    if integer:
+        values = data.view(">u2").astype(np.float32)
+        values[:, _SPS30_SIZE] /= 1000  # nm to µm
+    else:
+        values = data.view(">f4").astype(np.float32)
+    values[~good] = _NAN
+    if out is None:
+        return values
+    out[:] = values
+    return out
+
+def _sps30_loop(frames, integer, out):
+    frame_len = 3 * NUMBER_OF_MEASURES if integer else 6 * NUMBER_OF_MEASURES
+    n = len(frames) // frame_len
+    if out is None:
+        out = array("f", [0.0] * (NUMBER_OF_MEASURES * n))
+    frames = memoryview(frames)
+    raw = _byte_view(out)
+    fmap = FLOAT_FRAME_MAP
+    for k in range(n):
+        frame = frames[k * frame_len:(k + 1) * frame_len]
+        base = k * NUMBER_OF_MEASURES
+        if check_words(frame) >= 0:
+            for i in range(base, base + NUMBER_OF_MEASURES):
+                out[i] = _NAN
+        elif integer:
+            for i in range(NUMBER_OF_MEASURES):
+                out[base + i] = (frame[3*i] << 8) | frame[3*i + 1]
+            out[base + _SPS30_SIZE] /= 1000  # nm to µm
+        else:
+            # strip the CRC bytes and swap to native order, see read_values
+            offset = 4 * base
+            for i in range(4 * NUMBER_OF_MEASURES):
+                raw[offset + i] = frame[fmap[i]]
+    return out
@@ -0,0 +1,281 @@
+import gc
+import sys
+try:
+    import json
+except ImportError:
+    import ujson as json
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    # CPython
+    from time import monotonic
+    def ticks_us():
+        return int(monotonic() * 1000_000)
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+BENCH_FORMAT = 1
+BENCH_FREQS = (100_000, 400_000)
+# fields of a result which must not grow between versions
+EXACT_FIELDS = ("transfers", "bytes_written", "bytes_read", "naks", "alloc_bytes")
+
+# machine.I2C methods which are counted, each call is accounted once,
+# also when the implementation calls another one of them
+_COUNTED = ("writeto", "writevto", "readfrom_into", "readfrom",
+            "writeto_mem", "readfrom_mem_into", "readfrom_mem",
+            "writeto_then_readfrom", "transfer", "scan")
+
+
+class BusCounter():
+    '''
+    counts the transfers on an I2C bus by wrapping its methods on the
+    instance, e.g. of an I2CBUS. The counts follow from the arguments of
+    each call, the way the transfer looks on the wire:
+    a transfer is one START (or repeated START) with the address byte
+    '''
+    def __init__(self, bus):
+        self.bus = bus
+        self._saved = None
+        self._depth = 0
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.transfers = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.naks = 0
+        self.bits = 0  # SCL cycles incl. START, ACKs and STOP
+
+    def attach(self):
+        if self._saved is not None:
+            return self
+        self._saved = []
+        for name in _COUNTED:
+            func = getattr(self.bus, name, None)
+            if func is not None:
+                setattr(self.bus, name, self._wrap(func, getattr(self, "_" + name)))
+                self._saved.append(name)
+        return self
+
+    def detach(self):
+        if self._saved is None:
+            return
+        for name in self._saved:
+            delattr(self.bus, name)
+        self._saved = None
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, *args):
+        self.detach()
+
+    def bus_time_us(self, freq):
+        '''
+        time the counted transfers take on the wire at freq,
+        without clock stretching
+        '''
+        return self.bits * 1000_000 / freq
+
+    def _wrap(self, func, account):
+        def counted(*args, **kwargs):
+            if self._depth:
+                return func(*args, **kwargs)
+            self._depth += 1
+            self.calls += 1
+            account(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            except OSError:
+                self.naks += 1
+                raise
+            finally:
+                self._depth -= 1
+        return counted
+
+    def _count(self, written, read, stop=True):
+        self.transfers += 1
+        self.bytes_written += written
+        self.bytes_read += read
+        self.bits += 10 + 9 * (written + read) + (1 if stop else 0)
+
+    def _writeto(self, addr, buf, stop=True):
+        self._count(len(buf), 0, stop)
+
+    def _writevto(self, addr, vector, stop=True):
+        n = 0
+        for buf in vector:
+            n += len(buf)
+        self._count(n, 0, stop)
+
+    def _readfrom_into(self, addr, buf, stop=True):
+        self._count(0, len(buf), stop)
+
+    def _readfrom(self, addr, nbytes, stop=True):
+        self._count(0, nbytes, stop)
+
+    def _writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self._count(addrsize // 8 + len(buf), 0)
+
+    def _readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        self._count(addrsize // 8, 0, False)
+        self._count(0, len(buf))
+
+    def _readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        self._count(addrsize // 8, 0, False)
+        self._count(0, nbytes)
+
+    def _writeto_then_readfrom(self, addr, out_buf, in_buf):
+        self._count(len(out_buf), 0, False)
+        self._count(0, len(in_buf))
+
+    def _transfer(self, addr, segments):
+        last = len(segments) - 1
+        for i in range(len(segments)):
+            buf, read = segments[i]
+            if read:
+                self._count(0, len(buf), i == last)
+            elif type(buf) is tuple:
+                n = 0
+                for part in buf:
+                    n += len(part)
+                self._count(n, 0, i == last)
+            else:
+                self._count(len(buf), 0, i == last)
+
+    def _scan(self):
+        for addr in range(0x08, 0x78):
+            self._count(0, 0)
+
+
+def _loop(op, iterations):
+    for i in range(iterations):
+        op()
+
+def _nop():
+    pass
+
+def allocated(op, iterations):
+    '''
+    bytes allocated by iterations calls of op. On MicroPython garbage
+    stays allocated until gc.collect(), so gc.mem_alloc grows by every
+    allocation. CPython frees at once, there the peak of each call above
+    the heap level before it is added up, which includes freed blocks
+    '''
+    if tracemalloc is None:
+        gc.collect()
+        before = gc.mem_alloc()
+        _loop(op, iterations)
+        return gc.mem_alloc() - before
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    total = 0
+    for i in range(iterations):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        op()
+        total += tracemalloc.get_traced_memory()[1] - before
+    return total
+
+def measure(counter, op, iterations=20, freqs=BENCH_FREQS):
+    '''
+    runs op once to warm up, then three passes of iterations calls:
+    counted on the bus, timed, and for the heap allocations,
+    the counter is detached while timing and allocating.
+    returns the figures per call of op
+    '''
+    op()
+    counter.reset()
+    with counter:
+        _loop(op, iterations)
+    result = {
+        "iterations": iterations,
+        "calls": counter.calls / iterations,
+        "transfers": counter.transfers / iterations,
+        "bytes_written": counter.bytes_written / iterations,
+        "bytes_read": counter.bytes_read / iterations,
+        "naks": counter.naks / iterations,
+        "bus_time_us": {}}
+    for freq in freqs:
+        key = "{}kHz".format(freq // 1000)
+        result["bus_time_us"][key] = counter.bus_time_us(freq) / iterations
+
+    gc.collect()
+    start = ticks_us()
+    _loop(_nop, iterations)
+    overhead = ticks_diff(ticks_us(), start)
+    start = ticks_us()
+    _loop(op, iterations)
+    elapsed = ticks_diff(ticks_us(), start)
+    result["wall_us"] = max(0, elapsed - overhead) / iterations
+
+    overhead = allocated(_nop, iterations)
+    alloc = allocated(op, iterations)
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    result["alloc_bytes"] = max(0, alloc - overhead) / iterations
+    return result
+
+
+class Bench():
+    '''
+    collection of named scenarios measured on one bus,
+    bench.add("bme280_forced", bme.ReadAllMeasures)
+    '''
+    def __init__(self, bus, iterations=20, freqs=BENCH_FREQS):
+        self.counter = BusCounter(bus)
+        self.iterations = iterations
+        self.freqs = freqs
+        self.results = {}
+
+    def add(self, name, op, iterations=None):
+        if iterations is None:
+            iterations = self.iterations
+        self.results[name] = measure(self.counter, op, iterations, self.freqs)
+        return self.results[name]
+
+    def report(self):
+        return {
+            "format": BENCH_FORMAT,
+            "implementation": sys.implementation.name,
+            "platform": sys.platform,
+            "results": self.results}
+
+    def dumps(self):
+        return json.dumps(self.report())
+
+    def save(self, filename):
+        with open(filename, "w") as f:
+            f.write(self.dumps())
+
+
+def load(filename):
+    with open(filename) as f:
+        return json.loads(f.read())
+
+def regressions(base, current, tolerance=0.25, slack_us=10):
+    '''
+    (scenario, field, base value, current value) of every figure of the
+    current report which is worse than in the base report. Bus figures and
+    allocations must not grow at all, wall time by no more than tolerance
+    and slack_us
+    '''
+    found = []
+    base = base["results"]
+    current = current["results"]
+    for name in current:
+        if name not in base:
+            continue
+        old = base[name]
+        new = current[name]
+        for field in EXACT_FIELDS:
+            if new[field] > old[field]:
+                found.append((name, field, old[field], new[field]))
+        if new["wall_us"] > old["wall_us"] * (1 + tolerance) + slack_us:
+            found.append((name, "wall_us", old["wall_us"], new["wall_us"]))
+    return found
@@ -0,0 +1,214 @@
+from array import array
+from math import sqrt
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython
+    from time import monotonic
+    def ticks_ms():
+        return int(monotonic() * 1000)
+    def ticks_add(ticks, delta):
+        return ticks + delta
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+# raw samples, 1 minute and 1 hour buckets: (capacity, bucket length in ms)
+DEFAULT_LEVELS = ((60, 0), (60, 60_000), (24, 3_600_000))
+
+
+class Ring():
+    '''
+    fixed capacity ring of samples with timestamps
+    mean, stddev, min and max over the stored samples in O(1)
+    '''
+    def __init__(self, capacity, typecode="f"):
+        zero = 0.0 if typecode in "fd" else 0
+        self.values = array(typecode, [zero] * capacity)
+        self.times = array("l", [0] * capacity)
+        self._cap = capacity
+        self._seq = 0    # number of samples ever pushed
+        self._count = 0
+        self._sum = zero
+        self._sumsq = zero
+        # monotonic queues of sample numbers for min and max
+        self._minq = array("l", [0] * capacity)
+        self._maxq = array("l", [0] * capacity)
+        self._minq_head = self._minq_len = 0
+        self._maxq_head = self._maxq_len = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, value, t):
+        cap = self._cap
+        seq = self._seq
+        i = seq % cap
+        values = self.values
+        if self._count == cap:
+            old = values[i]
+            self._sum -= old
+            self._sumsq -= old * old
+            # drop the evicted sample from the queues
+            if self._minq_len and self._minq[self._minq_head] == seq - cap:
+                self._minq_head = (self._minq_head + 1) % cap
+                self._minq_len -= 1
+            if self._maxq_len and self._maxq[self._maxq_head] == seq - cap:
+                self._maxq_head = (self._maxq_head + 1) % cap
+                self._maxq_len -= 1
+        else:
+            self._count += 1
+        values[i] = value
+        self.times[i] = t
+        value = values[i]  # as stored, e.g. rounded to float32
+        self._sum += value
+        self._sumsq += value * value
+
+        q = self._minq
+        n = self._minq_len
+        while n and values[q[(self._minq_head + n - 1) % cap] % cap] >= value:
+            n -= 1
+        q[(self._minq_head + n) % cap] = seq
+        self._minq_len = n + 1
+
+        q = self._maxq
+        n = self._maxq_len
+        while n and values[q[(self._maxq_head + n - 1) % cap] % cap] <= value:
+            n -= 1
+        q[(self._maxq_head + n) % cap] = seq
+        self._maxq_len = n + 1
+
+        self._seq = seq + 1
+        if self._seq % cap == 0:
+            self._resum()
+
+    def _resum(self):
+        # running sums pick up rounding errors, restart them once per lap
+        s = sq = self._sum - self._sum
+        for value in self.values:
+            s += value
+            sq += value * value
+        self._sum = s
+        self._sumsq = sq
+
+    def clear(self):
+        self._seq = self._count = 0
+        self._sum -= self._sum
+        self._sumsq -= self._sumsq
+        self._minq_head = self._minq_len = 0
+        self._maxq_head = self._maxq_len = 0
+
+    def latest(self):
+        if not self._count:
+            return None
+        return self.values[(self._seq - 1) % self._cap]
+
+    def mean(self):
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+    def stddev(self):
+        if not self._count:
+            return None
+        mean = self._sum / self._count
+        return sqrt(max(0, self._sumsq / self._count - mean * mean))
+
+    def min(self):
+        if not self._count:
+            return None
+        return self.values[self._minq[self._minq_head] % self._cap]
+
+    def max(self):
+        if not self._count:
+            return None
+        return self.values[self._maxq[self._maxq_head] % self._cap]
+
+    def items(self):
+        '''
+        (time, value) pairs, oldest first
+        '''
+        cap = self._cap
+        for seq in range(self._seq - self._count, self._seq):
+            yield self.times[seq % cap], self.values[seq % cap]
+
+
+class MeasureHistory():
+    '''
+    history of one measure in several resolutions
+    levels: (capacity, bucket_ms) per ring, bucket_ms 0 keeps raw samples,
+    else the mean of each bucket of bucket_ms is kept
+    '''
+    def __init__(self, levels=DEFAULT_LEVELS, typecode="f"):
+        self.levels = []
+        for capacity, bucket_ms in levels:
+            self.levels.append(Ring(capacity, typecode))
+        self._bucket_ms = [bucket_ms for _, bucket_ms in levels]
+        self._integer = typecode not in "fd"
+        n = len(levels)
+        self._acc = [0.0] * n
+        self._acc_n = [0] * n
+        self._start = [None] * n
+
+    def add(self, value, t):
+        if self._integer:
+            # driver values are floats
+            value = int(value)
+        for k in range(len(self.levels)):
+            bucket_ms = self._bucket_ms[k]
+            if not bucket_ms:
+                self.levels[k].push(value, t)
+                continue
+            start = self._start[k]
+            if start is None:
+                start = self._start[k] = t
+            elif ticks_diff(t, start) >= bucket_ms:
+                if self._acc_n[k]:
+                    mean = self._acc[k] / self._acc_n[k]
+                    if self._integer:
+                        mean = int(mean)
+                    self.levels[k].push(mean, start)
+                # skip empty buckets, stay on the bucket grid
+                while ticks_diff(t, start) >= bucket_ms:
+                    start = ticks_add(start, bucket_ms)
+                self._start[k] = start
+                self._acc[k] = 0.0
+                self._acc_n[k] = 0
+            self._acc[k] += value
+            self._acc_n[k] += 1
+
+    def __getitem__(self, level):
+        return self.levels[level]
+
+    @property
+    def raw(self):
+        return self.levels[0]
+
+
+class History():
+    '''
+    history store for the measures of a sensor driver
+
+        bme280.history = History(("temp", "pres", "humi"))
+
+    every successful ReadAllMeasures of the driver is then recorded
+    '''
+    def __init__(self, keys, levels=DEFAULT_LEVELS, typecode="f"):
+        self.keys = tuple(keys)
+        self.measures = {}
+        for key in self.keys:
+            self.measures[key] = MeasureHistory(levels, typecode)
+        self._slots = None
+
+    def __getitem__(self, key):
+        return self.measures[key]
+
+    def record(self, sensor, t=None):
+        if t is None:
+            t = ticks_ms()
+        record = sensor.record
+        if self._slots is None:
+            self._slots = [(record.index(key), self.measures[key])
+                           for key in self.keys]
+        values = record.values
+        for i, history in self._slots:
+            history.add(values[i], t)
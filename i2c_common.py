@@ -0,0 +1,339 @@
+from i2c_lock import BusLock, Transaction, NO_TRANSACTION
+
+# Backend interface of an I2CBUS, the methods of machine.I2C used here:
+#   writeto(addr, buf, stop=True), readfrom_into(addr, buf, stop=True),
+#   writeto_mem(addr, memaddr, buf, addrsize=8),
+#   readfrom_mem_into(addr, memaddr, buf, addrsize=8), scan()
+# and optionally writeto_then_readfrom(addr, out_buf, in_buf).
+# The platform modules MPY/, LVGL_MPY/ and LINUX/i2c_core.py
+# combine I2CBusMixin with their backend to the class I2CBUS.
+
+def transfer_segments(bus, addr, segments):
+    '''
+    runs segments on bus with a repeated START between them and a
+    STOP after the last: (buffer, True) reads into buffer,
+    (buffer, False) writes it, (tuple of buffers, False) writes them
+    '''
+    last = len(segments) - 1
+    for i in range(len(segments)):
+        buf, read = segments[i]
+        if read:
+            bus.readfrom_into(addr, buf, i == last)
+        elif type(buf) is tuple:
+            bus.writevto(addr, buf, i == last)
+        else:
+            bus.writeto(addr, buf, i == last)
+
+
+class I2CBusMixin():
+    '''
+    locking, probing and scan cache of an I2CBUS,
+    independent of the backend
+    '''
+    def _init_bus(self, port, scl, sda, freq):
+        self._port = port
+        self._scl = scl
+        self._sda = sda
+        self._freq = freq
+        self._lock = BusLock()
+        self._scan_cache = None
+        self._probe_buf = bytearray(1)
+
+    def __str__(self):
+        return f"I2C({self._port}, scl={self._scl}, sda={self._sda}, freq={self._freq}"
+
+    def transaction(self, dev=None):
+        '''
+        context holding the bus lock, selects the mux channel of dev
+        with bus.transaction(dev): or async with bus.transaction(dev):
+        '''
+        return Transaction(self._lock, dev)
+
+    def probe(self, addr, read=False):
+        '''
+        True if addr acknowledges, only this address is addressed:
+        a zero length write, or a 1 byte read for devices which
+        don't like the former. Answered from the scan cache if valid
+        '''
+        if self._scan_cache is not None:
+            return addr in self._scan_cache
+        with self.transaction():
+            try:
+                if read:
+                    self.readfrom_into(addr, self._probe_buf)
+                else:
+                    self.writeto(addr, b'')
+            except OSError:
+                return False
+        return True
+
+    def scan_cached(self):
+        '''
+        result of the last scan, scans only if the cache is invalid
+        '''
+        if self._scan_cache is None:
+            with self.transaction():
+                self._scan_cache = self.scan()
+        return self._scan_cache
+
+    def invalidate_scan(self):
+        '''
+        the devices on the bus changed, e.g. by switching a mux
+        '''
+        self._scan_cache = None
+
+    def writeto_then_readfrom(self, addr, out_buf, in_buf):
+        '''
+        writes out_buf and reads in_buf from addr,
+        separated by a repeated START
+        '''
+        self.writeto(addr, out_buf, False)
+        self.readfrom_into(addr, in_buf)
+
+    def transfer(self, addr, segments):
+        '''
+        segments: (buffer, read) pairs, run as one transfer with
+        repeated STARTs, see transfer_segments
+        '''
+        transfer_segments(self, addr, segments)
+
+
+class I2CDEV():
+    def __init__(self, bus, dev_id, probe_on_bus=True, reg_bits=8):
+        self._bus = bus
+        self._addr = dev_id
+        self._reg_bits = reg_bits
+        self._detected = False
+        self._mux = None
+        self._channel = 0
+        self.metrics = None  # i2c_metrics.DeviceMetrics, see enable_metrics
+        if hasattr(bus, "transaction"):
+            self._txn = bus.transaction(self)
+        else:
+            self._txn = NO_TRANSACTION
+        self._combined = hasattr(bus, "writeto_then_readfrom")
+        self._batched = hasattr(bus, "transfer")
+        if probe_on_bus == True:
+            self.probe()
+        
+    
+    def __str__(self):
+        return f"I2CDevice({self._bus}, addr={self._addr:02x}, reg_addr_width={self._reg_bits}, detected={self._detected})"
+
+    def probe(self):
+        '''
+        checks again if the device answers, sets detected
+        '''
+        if hasattr(self._bus, "probe"):
+            self._detected = self._bus.probe(self._addr)
+        else:
+            self._detected = self._addr in self._bus.scan()
+        return self._detected
+
+    def set_route(self, mux, channel):
+        '''
+        device sits behind channel of the PCA9548 mux,
+        the channel is selected at the start of each transaction
+        '''
+        self._mux = mux
+        self._channel = channel
+
+    def enable_metrics(self, metrics=None):
+        '''
+        counts transactions, errors and latency into metrics,
+        a new i2c_metrics.DeviceMetrics if None
+        '''
+        if metrics is None:
+            from i2c_metrics import DeviceMetrics
+            metrics = DeviceMetrics()
+        self.metrics = metrics
+        return metrics
+
+    def disable_metrics(self):
+        self.metrics = None
+
+    def crc_failed(self):
+        '''
+        called by the drivers when a CRC check of received data fails
+        '''
+        if self.metrics is not None:
+            self.metrics.crc_failed()
+
+    def write(self, tx_data):
+        metrics = self.metrics
+        if metrics is None:
+            with self._txn:
+                self._bus.writeto(self._addr, tx_data)
+            return
+        start = metrics.start()
+        try:
+            with self._txn:
+                self._bus.writeto(self._addr, tx_data)
+        except OSError as e:
+            metrics.failed(start, e)
+            raise
+        metrics.done(start, len(tx_data), 0)
+
+    def read_into(self, rx_data):
+        metrics = self.metrics
+        if metrics is None:
+            with self._txn:
+                self._bus.readfrom_into(self._addr, rx_data)
+            return
+        start = metrics.start()
+        try:
+            with self._txn:
+                self._bus.readfrom_into(self._addr, rx_data)
+        except OSError as e:
+            metrics.failed(start, e)
+            raise
+        metrics.done(start, 0, len(rx_data))
+        
+    def read(self, rx_len):
+        rx_data = bytearray(rx_len)
+        self.read_into(memoryview(rx_data))
+        return rx_data        
+        
+    def _write_read_into(self, tx_data, rx_data):
+        with self._txn:
+            if self._combined:
+                self._bus.writeto_then_readfrom(self._addr, tx_data, rx_data)
+            else:
+                self._bus.writeto(self._addr, tx_data, False)
+                self._bus.readfrom_into(self._addr, rx_data)
+
+    def write_read_into(self, tx_data, rx_data):
+        metrics = self.metrics
+        if metrics is None:
+            self._write_read_into(tx_data, rx_data)
+            return
+        start = metrics.start()
+        try:
+            self._write_read_into(tx_data, rx_data)
+        except OSError as e:
+            metrics.failed(start, e)
+            raise
+        metrics.done(start, len(tx_data), len(rx_data))
+    
+    def write_mem(self, regaddr, tx_data):
+        metrics = self.metrics
+        if metrics is None:
+            with self._txn:
+                self._bus.writeto_mem(self._addr, regaddr, tx_data, addrsize=self._reg_bits)
+            return
+        start = metrics.start()
+        try:
+            with self._txn:
+                self._bus.writeto_mem(self._addr, regaddr, tx_data, addrsize=self._reg_bits)
+        except OSError as e:
+            metrics.failed(start, e)
+            raise
+        metrics.done(start, self._reg_bits // 8 + len(tx_data), 0)
+    
+    def read_mem_into(self, regaddr, rx_data):
+        metrics = self.metrics
+        if metrics is None:
+            with self._txn:
+                self._bus.readfrom_mem_into(self._addr, regaddr,  rx_data, addrsize=self._reg_bits)
+            return
+        start = metrics.start()
+        try:
+            with self._txn:
+                self._bus.readfrom_mem_into(self._addr, regaddr,  rx_data, addrsize=self._reg_bits)
+        except OSError as e:
+            metrics.failed(start, e)
+            raise
+        metrics.done(start, self._reg_bits // 8, len(rx_data))
+        
+    def read_mem(self, regaddr, rx_len):
+        rx_data = bytearray(rx_len)        
+        self.read_mem_into(regaddr, rx_data)
+        return rx_data
+
+    def batch(self):
+        '''
+        new I2CBatch of operations on this device
+        '''
+        return I2CBatch(self)
+
+    def run_batch(self, segments):
+        '''
+        runs (buffer, read) segments as one transfer, see I2CBatch
+        '''
+        metrics = self.metrics
+        if metrics is None:
+            with self._txn:
+                if self._batched:
+                    self._bus.transfer(self._addr, segments)
+                else:
+                    transfer_segments(self._bus, self._addr, segments)
+            return
+        start = metrics.start()
+        try:
+            with self._txn:
+                if self._batched:
+                    self._bus.transfer(self._addr, segments)
+                else:
+                    transfer_segments(self._bus, self._addr, segments)
+        except OSError as e:
+            metrics.failed(start, e)
+            raise
+        written = 0
+        read = 0
+        for buf, rd in segments:
+            if rd:
+                read += len(buf)
+            elif type(buf) is tuple:
+                for part in buf:
+                    written += len(part)
+            else:
+                written += len(buf)
+        metrics.done(start, written, read)
+
+    @property
+    def detected(self):
+        return self._detected
+
+
+class I2CBatch():
+    '''
+    operations on one device which run as one transfer: repeated STARTs
+    in between, the bus stays locked. Results go to the caller's buffers,
+    a batch can be run again and again
+    b = dev.batch().write(CMD).read(answer); b.run()
+    '''
+    def __init__(self, dev):
+        self._dev = dev
+        self._segments = []
+
+    def __len__(self):
+        return len(self._segments)
+
+    def _regaddr(self, regaddr):
+        return regaddr.to_bytes(self._dev._reg_bits // 8, "big")
+
+    def write(self, tx_data):
+        self._segments.append((tx_data, False))
+        return self
+
+    def read(self, rx_data):
+        self._segments.append((rx_data, True))
+        return self
+
+    def write_mem(self, regaddr, tx_data):
+        self._segments.append(((self._regaddr(regaddr), tx_data), False))
+        return self
+
+    def read_mem(self, regaddr, rx_data):
+        self._segments.append((self._regaddr(regaddr), False))
+        self._segments.append((rx_data, True))
+        return self
+
+    def clear(self):
+        self._segments = []
+        return self
+
+    def run(self):
+        if self._segments:
+            self._dev.run_batch(self._segments)
+        return self
@@ -0,0 +1,110 @@
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+
+class BusLock():
+    '''
+    reentrant lock arbitrating a shared I2CBUS
+    the owning thread may nest transactions, other threads wait
+    '''
+    def __init__(self):
+        self._lock = _thread.allocate_lock() if _thread else None
+        self._owner = None
+        self._depth = 0
+        self._alock = None
+
+    def acquire(self):
+        if self._lock is None:
+            self._depth += 1
+            return self._depth
+        me = _thread.get_ident()
+        if self._owner == me:
+            self._depth += 1
+            return self._depth
+        self._lock.acquire()
+        self._owner = me
+        self._depth = 1
+        return 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._lock is not None:
+            self._owner = None
+            self._lock.release()
+
+    @property
+    def locked(self):
+        return self._depth > 0
+
+    @property
+    def async_lock(self):
+        '''
+        asyncio lock serialising tasks, created on first use
+        '''
+        if self._alock is None:
+            try:
+                import asyncio
+            except ImportError:
+                import uasyncio as asyncio
+            self._alock = asyncio.Lock()
+        return self._alock
+
+
+class Transaction():
+    '''
+    holds the bus lock for a device and selects the mux channel
+    the device sits behind, usable with "with" and "async with"
+
+    with "async with" the bus is held across awaits for other tasks
+    using "async with"; every single transfer still re-asserts its
+    mux channel, so plain calls from other tasks can not misroute it
+    '''
+    def __init__(self, lock, dev=None):
+        self._lock = lock
+        self._dev = dev
+
+    def __enter__(self):
+        self._lock.acquire()
+        dev = self._dev
+        if dev is not None and dev._mux is not None:
+            try:
+                dev._mux.enable(dev._channel)
+            except Exception:
+                self._lock.release()
+                raise
+        return dev
+
+    def __exit__(self, exc_type, exc, tb):
+        self._lock.release()
+        return False
+
+    async def __aenter__(self):
+        alock = self._lock.async_lock
+        await alock.acquire()
+        try:
+            self.__enter__()
+        except Exception:
+            alock.release()
+            raise
+        # the thread lock must not be held across awaits
+        self._lock.release()
+        return self._dev
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._lock.async_lock.release()
+        return False
+
+
+class NoTransaction():
+    '''
+    stands in for Transaction on buses without locking support
+    '''
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NO_TRANSACTION = NoTransaction()
@@ -0,0 +1,130 @@
+from array import array
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    # CPython
+    from time import monotonic
+    def ticks_us():
+        return int(monotonic() * 1000_000)
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+# upper bounds of the latency buckets in µs, one more bucket for longer ones
+LATENCY_BUCKETS_US = (100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+# errno of a NAK: address (MP_ENODEV) or data byte (MP_EIO),
+# on Linux ENXIO or EREMOTEIO depending on the adapter
+NAK_ERRNOS = (19, 5, 6, 121)
+
+
+class DeviceMetrics():
+    '''
+    counters of one I2CDEV: transactions, bytes, OSErrors, NAKs,
+    CRC failures and a fixed bucket histogram of the transaction time
+    dev.enable_metrics(); ...; dev.metrics.snapshot()
+    '''
+    def __init__(self, buckets=LATENCY_BUCKETS_US):
+        self.buckets = buckets
+        self.histogram = array("L", [0] * (len(buckets) + 1))
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.errors = 0      # OSErrors incl. NAKs
+        self.naks = 0
+        self.crc_errors = 0
+        self.total_us = 0
+        self.max_us = 0
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+
+    def start(self):
+        return ticks_us()
+
+    def done(self, start, written, read):
+        '''
+        transaction started at start finished
+        '''
+        us = ticks_diff(ticks_us(), start)
+        self.transactions += 1
+        self.bytes_written += written
+        self.bytes_read += read
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+        buckets = self.buckets
+        i = 0
+        while i < len(buckets) and us > buckets[i]:
+            i += 1
+        self.histogram[i] += 1
+
+    def failed(self, start, error):
+        '''
+        transaction started at start raised the OSError error
+        '''
+        self.done(start, 0, 0)
+        self.errors += 1
+        if error.args and error.args[0] in NAK_ERRNOS:
+            self.naks += 1
+
+    def crc_failed(self):
+        self.crc_errors += 1
+
+    @property
+    def error_rate(self):
+        '''
+        failed transactions and CRC failures per transaction
+        '''
+        if self.transactions == 0:
+            return 0.0
+        return (self.errors + self.crc_errors) / self.transactions
+
+    def snapshot(self):
+        '''
+        copy of the counters as a dict, e.g. for json.dumps
+        '''
+        return {
+            "transactions": self.transactions,
+            "bytes_written": self.bytes_written,
+            "bytes_read": self.bytes_read,
+            "errors": self.errors,
+            "naks": self.naks,
+            "crc_errors": self.crc_errors,
+            "error_rate": self.error_rate,
+            "latency_us": {
+                "total": self.total_us,
+                "max": self.max_us,
+                "buckets": list(self.buckets),
+                "counts": list(self.histogram)}}
+
+
+def device_name(dev):
+    '''
+    "76", "76@70.3" for a device behind channel 3 of the mux at 0x70,
+    with a prefix for a bus other than 0, e.g. "1:76@70.3"
+    '''
+    name = "{:02x}".format(dev._addr)
+    if dev._mux is not None:
+        name += "@{:02x}.{}".format(dev._mux.address, dev._channel)
+    bus = dev._bus
+    while hasattr(bus, "mux") and hasattr(bus, "number"):
+        name += "@{:02x}.{}".format(bus.mux.address, bus.number)
+        bus = bus.mux.i2c
+    port = getattr(bus, "_port", 0)
+    if port:
+        name = "{}:{}".format(port, name)
+    return name
+
+def snapshot(devices, reset=False):
+    '''
+    {device_name: snapshot} of the devices with metrics enabled
+    '''
+    result = {}
+    for dev in devices:
+        metrics = dev.metrics
+        if metrics is not None:
+            result[device_name(dev)] = metrics.snapshot()
+            if reset:
+                metrics.reset()
+    return result
@@ -0,0 +1,51 @@
+from array import array
+
+
+class MeasureRecord():
+    '''
+    measured values of one driver instance at fixed offsets of an
+    array('f'), units and labels come from a shared metadata table:
+    a tuple of (key, unit, label_en, label_de) per value
+    '''
+    __slots__ = ("meta", "values", "_view")
+
+    def __init__(self, meta, values=None):
+        self.meta = meta
+        if values is None:
+            values = array("f", [0.0] * len(meta))
+        self.values = values
+        self._view = None
+
+    def __len__(self):
+        return len(self.meta)
+
+    def index(self, key):
+        for i in range(len(self.meta)):
+            if self.meta[i][0] == key:
+                return i
+        raise KeyError(key)
+
+    def get(self, key):
+        return self.values[self.index(key)]
+
+    def set(self, key, value):
+        self.values[self.index(key)] = value
+
+    def view(self):
+        '''
+        {key: [value, unit, label_en, label_de]} like the former class
+        level measures dicts, built on first use and refreshed on access.
+        Read only, values written into it are overwritten by the next
+        access, use set()
+        '''
+        view = self._view
+        if view is None:
+            view = {}
+            for key, unit, label_en, label_de in self.meta:
+                view[key] = [0.0, unit, label_en, label_de]
+            self._view = view
+        values = self.values
+        meta = self.meta
+        for i in range(len(meta)):
+            view[meta[i][0]][0] = values[i]
+        return view
@@ -1,4 +1,6 @@
 from i2c_core import I2CDEV
+from i2c_common import transfer_segments
+from i2c_lock import BusLock, Transaction
 
 PCA9548_I2C_ADDRESS = 0x70
 
@@ -12,14 +14,149 @@ class PCA9548(I2CDEV):
             raise ValueError('An I2C object is required.')
         self.i2c = i2c
         super().__init__(bus=i2c, dev_id=address, probe_on_bus=True)
+        self._ctrl = bytearray(1)
+        self._mask = None  # unknown until the first write
+        self._channels = {}
 
     def enable(self, channel):
         if (channel <= 8) and (channel > 0):
-            self.write((1 << (channel-1)).to_bytes(1))
+            self.select_mask(1 << (channel-1))
         else:
-            self.write(b'\00')
+            self.select_mask(0)
         return
-    
+
     def disable(self):
-        self.write(b'\00')
+        self.select_mask(0)
+        return
+
+    def select_mask(self, mask):
+        '''
+        writes the control register, unless mask is already selected
+        '''
+        if mask == self._mask:
+            return
+        self._ctrl[0] = mask
+        try:
+            self.write(self._ctrl)
+        except OSError:
+            self._mask = None
+            raise
+        self._mask = mask
+        # other devices are visible on the bus now
+        if hasattr(self.i2c, "invalidate_scan"):
+            self.i2c.invalidate_scan()
         return
+
+    def invalidate(self):
+        '''
+        forget the cached control register, e.g. after a reset of the mux
+        '''
+        self._mask = None
+        return
+
+    @property
+    def mask(self):
+        return self._mask
+
+    def channel(self, channel):
+        '''
+        virtual I2CBUS for the devices behind channel 1..8
+        BME280(i2c=mux.channel(3))
+        '''
+        if (channel > 8) or (channel < 1):
+            raise ValueError('Channel must be 1 to 8.')
+        bus = self._channels.get(channel)
+        if bus is None:
+            bus = PCA9548Channel(self, channel)
+            self._channels[channel] = bus
+        return bus
+
+
+class PCA9548Channel():
+    '''
+    I2CBUS compatible view onto one channel of a PCA9548,
+    selects the channel before each transfer when needed
+    '''
+    def __init__(self, mux, channel):
+        self._mux = mux
+        self._channel = channel
+        self._bus = mux.i2c
+        self._lock = getattr(self._bus, "_lock", None) or BusLock()
+        self._txn = Transaction(self._lock, self)
+        self._scan_cache = None
+
+    def __str__(self):
+        return f"PCA9548Channel({self._bus}, mux={self._mux.address:02x}, channel={self._channel})"
+
+    @property
+    def mux(self):
+        return self._mux
+
+    @property
+    def number(self):
+        return self._channel
+
+    def transaction(self, dev=None):
+        return self._txn
+
+    def scan(self):
+        with self._txn:
+            return self._bus.scan()
+
+    def probe(self, addr, read=False):
+        '''
+        True if addr acknowledges on this channel, see I2CBUS.probe
+        '''
+        if self._scan_cache is not None:
+            return addr in self._scan_cache
+        with self._txn:
+            if hasattr(self._bus, "probe"):
+                return self._bus.probe(addr, read)
+            return addr in self._bus.scan()
+
+    def scan_cached(self):
+        if self._scan_cache is None:
+            self._scan_cache = self.scan()
+        return self._scan_cache
+
+    def invalidate_scan(self):
+        self._scan_cache = None
+
+    def writeto(self, addr, buf, stop=True):
+        with self._txn:
+            return self._bus.writeto(addr, buf, stop)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        with self._txn:
+            self._bus.readfrom_into(addr, buf, stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        with self._txn:
+            return self._bus.readfrom(addr, nbytes, stop)
+
+    def writeto_then_readfrom(self, addr, out_buf, in_buf):
+        with self._txn:
+            if hasattr(self._bus, "writeto_then_readfrom"):
+                self._bus.writeto_then_readfrom(addr, out_buf, in_buf)
+            else:
+                self._bus.writeto(addr, out_buf, False)
+                self._bus.readfrom_into(addr, in_buf)
+
+    def transfer(self, addr, segments):
+        with self._txn:
+            if hasattr(self._bus, "transfer"):
+                self._bus.transfer(addr, segments)
+            else:
+                transfer_segments(self._bus, addr, segments)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        with self._txn:
+            self._bus.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        with self._txn:
+            self._bus.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        with self._txn:
+            return self._bus.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
@@ -0,0 +1,268 @@
+# Binary log of samples: a header with metadata of the devices, then
+# fixed size records, little endian:
+#   uint32 time since the start in units of resolution_ms
+#   uint16 device, index into the devices list of the header
+#   uint16 flags, e.g. a failed CRC
+#   n_values values, float32 ("f") or int32 ("i", raw values)
+# The header is padded to a multiple of the block size, so the records
+# start at a block boundary and SampleLogWriter writes whole blocks, a
+# flushed partial block is written again in full once it is complete.
+try:
+    import json
+except ImportError:
+    import ujson as json
+try:
+    from ustruct import pack, pack_into, unpack_from
+except ImportError:
+    # CPython
+    from struct import pack, pack_into, unpack_from
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    # CPython
+    from time import monotonic
+    def ticks_ms():
+        return int(monotonic() * 1000)
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+from time import time
+
+LOG_MAGIC = b"SLOG"
+LOG_VERSION = 1
+# magic, version, value typecode, n_values, record size, header length,
+# start time (s since the epoch of the board), resolution in ms,
+# length of the JSON metadata which follows
+LOG_HEADER = "<4sBcHHIIHI"
+LOG_HEADER_SIZE = 24
+RECORD_HEADER = "<IHH"
+RECORD_HEADER_SIZE = 8
+LOG_BLOCK_SIZE = 512  # a flash sector / SD card block
+
+FLAG_CRC_ERROR = 1
+
+
+def device_meta(dev, name=None):
+    '''
+    metadata of a driver instance for the devices list of the header:
+    type, address, calibration (BME280 NVM as hex) and scale (SDP8XX)
+    '''
+    meta = {"type": type(dev).__name__, "address": dev._addr}
+    if name is not None:
+        meta["name"] = name
+    calibration = getattr(dev, "calibration", None)
+    if calibration is not None:
+        meta["calibration"] = calibration.hex()
+    scale = getattr(dev, "_scale", None)
+    if scale:
+        meta["scale"] = scale
+    return meta
+
+
+class SampleLogWriter():
+    '''
+    appends records to a new log file through a buffer of one block,
+    the file is written in whole blocks, which keeps flash erase and
+    write cycles down. Records may span two blocks. flush() writes the
+    partial block and keeps it buffered, the next flush or the full block
+    rewrites it at the same offset, so blocks stay aligned.
+    log = SampleLogWriter("bme.log", [device_meta(bme)], 3)
+    log.write(0, bme.read_tph_into(tph)); ...; log.close()
+    '''
+    def __init__(self, filename, devices, n_values, typecode="f",
+                 resolution_ms=10, block_size=LOG_BLOCK_SIZE, meta=None):
+        if typecode not in ("f", "i"):
+            raise ValueError("typecode must be 'f' or 'i'")
+        self.n_values = n_values
+        self.record_size = RECORD_HEADER_SIZE + 4 * n_values
+        self.resolution_ms = resolution_ms
+        self._value_fmt = "<" + typecode
+        header = {"devices": devices}
+        if meta is not None:
+            header["meta"] = meta
+        info = json.dumps(header).encode()
+        header_len = LOG_HEADER_SIZE + len(info)
+        header_len += -header_len % block_size
+        self._file = open(filename, "wb")
+        self._file.write(pack(LOG_HEADER, LOG_MAGIC, LOG_VERSION,
+                              typecode.encode(), n_values, self.record_size,
+                              header_len, int(time()), resolution_ms,
+                              len(info)))
+        self._file.write(info)
+        self._file.write(bytes(header_len - LOG_HEADER_SIZE - len(info)))
+        self._buf = bytearray(block_size)
+        self._pos = 0
+        self._block = header_len  # file offset of the block in _buf
+        self._partial = False  # _buf[0:_pos] is on the file already
+        self._rec = bytearray(self.record_size)
+        self._start = ticks_ms()
+        self._last = self._start
+        self._elapsed = 0  # ms, accumulated over ticks wrap arounds
+        self.records = 0
+
+    def _now(self):
+        now = ticks_ms()
+        self._elapsed += ticks_diff(now, self._last)
+        self._last = now
+        return self._elapsed // self.resolution_ms
+
+    def write(self, device, values, flags=0, t=None):
+        '''
+        appends a record of values (n_values of them, e.g. record.values
+        of a driver), t in units of resolution_ms since the start, now
+        if None
+        '''
+        if t is None:
+            t = self._now()
+        pos = self._pos
+        size = self.record_size
+        if pos + size <= len(self._buf):
+            buf = self._buf
+        else:
+            buf = self._rec
+            pos = 0
+        pack_into(RECORD_HEADER, buf, pos, t, device, flags)
+        fmt = self._value_fmt
+        pos += RECORD_HEADER_SIZE
+        for i in range(self.n_values):
+            pack_into(fmt, buf, pos, values[i])
+            pos += 4
+        if buf is self._buf:
+            self._pos = pos
+            if pos == len(buf):
+                self._write_block()
+        else:
+            self._append(buf)
+        self.records += 1
+
+    def _append(self, rec):
+        # record across the block boundary
+        buf = self._buf
+        pos = self._pos
+        for b in rec:
+            buf[pos] = b
+            pos += 1
+            if pos == len(buf):
+                self._pos = pos
+                self._write_block()
+                pos = 0
+        self._pos = pos
+
+    def _write_block(self):
+        if self._partial:
+            self._file.seek(self._block)
+            self._partial = False
+        self._file.write(self._buf)
+        self._block += len(self._buf)
+        self._pos = 0
+
+    def flush(self):
+        '''
+        writes the buffered records, they stay in the buffer and are
+        written again with the rest of their block
+        '''
+        if self._pos:
+            if self._partial:
+                self._file.seek(self._block)
+            self._file.write(memoryview(self._buf)[0:self._pos])
+            self._partial = True
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SampleLog():
+    '''
+    read only view of a log file through mmap (CPython), the columns
+    are memoryviews into the mapped file, without a copy
+    with SampleLog("bme.log") as log: log.column(0), log.times
+    '''
+    def __init__(self, filename):
+        import mmap
+        self._fd = open(filename, "rb")
+        self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, typecode, self.n_values, self.record_size, \
+            self.header_len, self.start_time, self.resolution_ms, \
+            info_len = unpack_from(LOG_HEADER, self._mm)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            self.close()
+            raise ValueError("not a sample log")
+        self.typecode = typecode.decode()
+        info = self._mm[LOG_HEADER_SIZE:LOG_HEADER_SIZE + info_len]
+        header = json.loads(info)
+        self.devices = header["devices"]
+        self.meta = header.get("meta")
+        self._len = (len(self._mm) - self.header_len) // self.record_size
+        self._records = memoryview(self._mm)[
+            self.header_len:self.header_len + self._len * self.record_size]
+
+    def __len__(self):
+        return self._len
+
+    def _column(self, typecode, offset):
+        size = 2 if typecode == "H" else 4
+        stride = self.record_size // size
+        return self._records.cast(typecode)[offset // size::stride]
+
+    @property
+    def times(self):
+        '''
+        uint32 timestamps in units of resolution_ms since start_time
+        '''
+        return self._column("I", 0)
+
+    @property
+    def device(self):
+        return self._column("H", 4)
+
+    @property
+    def flags(self):
+        return self._column("H", 6)
+
+    def column(self, i):
+        '''
+        value i of every record
+        '''
+        if not 0 <= i < self.n_values:
+            raise IndexError(i)
+        return self._column(self.typecode, RECORD_HEADER_SIZE + 4 * i)
+
+    def numpy(self):
+        '''
+        the records as a NumPy structured array onto the mapped file,
+        fields "t", "device", "flags" and "values" (n_values wide)
+        '''
+        import numpy as np
+        dtype = np.dtype([("t", "<u4"), ("device", "<u2"), ("flags", "<u2"),
+                          ("values", "<" + self.typecode + "4", (self.n_values,))])
+        return np.frombuffer(self._mm, dtype=dtype, count=self._len,
+                             offset=self.header_len)
+
+    def close(self):
+        '''
+        unmaps the file, if columns or arrays of it are still alive
+        the mapping stays until they are gone
+        '''
+        if self._mm is not None:
+            self._records = None
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+            self._mm = None
+            self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,193 @@
+try:
+    from time import ticks_ms, ticks_add, ticks_diff, sleep_ms
+except ImportError:
+    # CPython
+    from time import monotonic, sleep
+    def ticks_ms():
+        return int(monotonic() * 1000)
+    def ticks_add(ticks, delta):
+        return ticks + delta
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+    def sleep_ms(ms):
+        sleep(ms / 1000)
+
+
+def route_of(sensor):
+    '''
+    (mux, channel) a sensor sits behind, None if directly on the bus
+    '''
+    bus = getattr(sensor, "_bus", None)
+    if hasattr(bus, "mux") and hasattr(bus, "number"):
+        return (bus.mux, bus.number)
+    mux = getattr(sensor, "_mux", None)
+    if mux is not None:
+        return (mux, sensor._channel)
+    return None
+
+
+class ScheduledRead():
+    '''
+    one sensor polled with a fixed period
+    '''
+    def __init__(self, sensor, period_ms, read, name, deadline):
+        self.sensor = sensor
+        self.period = period_ms
+        self.read = read
+        self.name = name
+        self.route = route_of(sensor)
+        self.deadline = deadline
+        self.count = 0
+        self.misses = 0
+        self.errors = 0
+        self.jitter_max = 0
+        self.jitter_sum = 0
+
+    def stats(self):
+        return {"name": self.name,
+                "period": self.period,
+                "count": self.count,
+                "misses": self.misses,
+                "errors": self.errors,
+                "jitter_max": self.jitter_max,
+                "jitter_mean": self.jitter_sum / self.count if self.count else 0}
+
+
+class Scheduler():
+    '''
+    deadline scheduler for sensors with different natural rates
+    reads which are due together are batched by mux channel,
+    so the PCA9548 switches as seldom as possible
+
+        sched = Scheduler()
+        sched.add(sdp, 10)
+        sched.add(bme, 250)
+        sched.add(sps, 1000, read=sps.read_values)
+        sched.run(60_000)
+    '''
+    def __init__(self, slack_ms=2, clock=ticks_ms):
+        self._tasks = []
+        self._slack = slack_ms
+        self._clock = clock
+        self._route = None
+        self.switches = 0
+
+    def add(self, sensor, period_ms, read=None, name=None):
+        '''
+        polls sensor every period_ms with read, default ReadAllMeasures
+        '''
+        if period_ms <= 0:
+            raise ValueError("period_ms must be positive, got {}".format(period_ms))
+        if read is None:
+            read = sensor.ReadAllMeasures
+        if name is None:
+            name = "{}{}".format(type(sensor).__name__, len(self._tasks))
+        task = ScheduledRead(sensor, period_ms, read, name, self._clock())
+        self._tasks.append(task)
+        return task
+
+    def remove(self, task):
+        self._tasks.remove(task)
+
+    def plan(self, horizon_ms):
+        '''
+        list of (due in ms, name, route) for all reads within horizon_ms,
+        ordered by deadline
+        '''
+        now = self._clock()
+        plan = []
+        for task in self._tasks:
+            due = ticks_diff(task.deadline, now)
+            while due <= horizon_ms:
+                plan.append((max(0, due), task.name, task.route))
+                due += task.period
+        plan.sort(key=lambda entry: entry[0])
+        return plan
+
+    def _batches(self, due):
+        '''
+        orders due tasks: current channel first, then the other channels
+        by their most urgent read, each channel by deadline
+        '''
+        groups = {}
+        for task in due:
+            key = None if task.route is None else (id(task.route[0]), task.route[1])
+            if key in groups:
+                groups[key].append(task)
+            else:
+                groups[key] = [task]
+        current = None if self._route is None else (id(self._route[0]), self._route[1])
+        now = self._clock()
+        order = []
+        for key, tasks in groups.items():
+            tasks.sort(key=lambda t: ticks_diff(t.deadline, now))
+            urgency = ticks_diff(tasks[0].deadline, now)
+            # reads without mux and on the selected channel cost no switch
+            first = 0 if key is None or key == current else 1
+            order.append((first, urgency, tasks))
+        order.sort(key=lambda entry: (entry[0], entry[1]))
+        return order
+
+    def run_pending(self):
+        '''
+        executes all reads due now, returns the number of reads done
+        '''
+        now = self._clock()
+        due = [t for t in self._tasks
+               if ticks_diff(t.deadline, now) <= self._slack]
+        if not due:
+            return 0
+        for _, _, tasks in self._batches(due):
+            for task in tasks:
+                if task.route is not None and task.route != self._route:
+                    self.switches += 1
+                    self._route = task.route
+                start = self._clock()
+                late = ticks_diff(start, task.deadline)
+                try:
+                    task.read()
+                except (OSError, RuntimeError):
+                    task.errors += 1
+                task.count += 1
+                jitter = abs(late)
+                task.jitter_sum += jitter
+                if jitter > task.jitter_max:
+                    task.jitter_max = jitter
+                task.deadline = ticks_add(task.deadline, task.period)
+                # periods which passed completely are missed
+                while ticks_diff(task.deadline, start) < 0:
+                    task.deadline = ticks_add(task.deadline, task.period)
+                    task.misses += 1
+        return len(due)
+
+    def next_due(self):
+        '''
+        ms until the next read is due, None without tasks
+        '''
+        if not self._tasks:
+            return None
+        now = self._clock()
+        return max(0, min(ticks_diff(t.deadline, now) for t in self._tasks))
+
+    def run(self, duration_ms=None):
+        '''
+        runs the schedule for duration_ms, forever if None
+        '''
+        start = self._clock()
+        while duration_ms is None or \
+                ticks_diff(self._clock(), start) < duration_ms:
+            self.run_pending()
+            wait = self.next_due()
+            if wait is None:
+                return
+            if wait > self._slack:
+                sleep_ms(wait - self._slack)
+
+    def stats(self):
+        return [task.stats() for task in self._tasks]
+
+    def reset_stats(self):
+        for task in self._tasks:
+            task.count = task.misses = task.errors = 0
+            task.jitter_max = task.jitter_sum = 0
+        self.switches = 0
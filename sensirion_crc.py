@@ -0,0 +1,72 @@
+# Sensirion CRC-8 shared by the SDP8XX and SPS30 drivers
+#
+# Width: 8 bit
+# Polynom: 0x31
+# Init: 0xFF
+# no Reflects
+# Final XOR: 0x00 (none)
+#
+# The table is a plain bytes constant, so it ends up in flash when the
+# module is frozen and costs no RAM.
+
+CRC8_INIT = 0xFF
+
+CRC8_TABLE = (
+    b"\x00\x31\x62\x53\xc4\xf5\xa6\x97\xb9\x88\xdb\xea\x7d\x4c\x1f\x2e"
+    b"\x43\x72\x21\x10\x87\xb6\xe5\xd4\xfa\xcb\x98\xa9\x3e\x0f\x5c\x6d"
+    b"\x86\xb7\xe4\xd5\x42\x73\x20\x11\x3f\x0e\x5d\x6c\xfb\xca\x99\xa8"
+    b"\xc5\xf4\xa7\x96\x01\x30\x63\x52\x7c\x4d\x1e\x2f\xb8\x89\xda\xeb"
+    b"\x3d\x0c\x5f\x6e\xf9\xc8\x9b\xaa\x84\xb5\xe6\xd7\x40\x71\x22\x13"
+    b"\x7e\x4f\x1c\x2d\xba\x8b\xd8\xe9\xc7\xf6\xa5\x94\x03\x32\x61\x50"
+    b"\xbb\x8a\xd9\xe8\x7f\x4e\x1d\x2c\x02\x33\x60\x51\xc6\xf7\xa4\x95"
+    b"\xf8\xc9\x9a\xab\x3c\x0d\x5e\x6f\x41\x70\x23\x12\x85\xb4\xe7\xd6"
+    b"\x7a\x4b\x18\x29\xbe\x8f\xdc\xed\xc3\xf2\xa1\x90\x07\x36\x65\x54"
+    b"\x39\x08\x5b\x6a\xfd\xcc\x9f\xae\x80\xb1\xe2\xd3\x44\x75\x26\x17"
+    b"\xfc\xcd\x9e\xaf\x38\x09\x5a\x6b\x45\x74\x27\x16\x81\xb0\xe3\xd2"
+    b"\xbf\x8e\xdd\xec\x7b\x4a\x19\x28\x06\x37\x64\x55\xc2\xf3\xa0\x91"
+    b"\x47\x76\x25\x14\x83\xb2\xe1\xd0\xfe\xcf\x9c\xad\x3a\x0b\x58\x69"
+    b"\x04\x35\x66\x57\xc0\xf1\xa2\x93\xbd\x8c\xdf\xee\x79\x48\x1b\x2a"
+    b"\xc1\xf0\xa3\x92\x05\x34\x67\x56\x78\x49\x1a\x2b\xbc\x8d\xde\xef"
+    b"\x82\xb3\xe0\xd1\x46\x77\x24\x15\x3b\x0a\x59\x68\xff\xce\x9d\xac")
+
+
+def calc_crc(data, start=0, end=None):
+    '''
+    calculates CRC-8 of data[start:end]
+    without slicing data
+    '''
+    if end is None:
+        end = len(data)
+    table = CRC8_TABLE
+    crc = CRC8_INIT
+    for i in range(start, end):
+        crc = table[crc ^ data[i]]
+    return crc
+
+
+def check_words(data, length=None):
+    '''
+    Checks the CRC of every word in data[0:length] in place.
+    two data bytes are followed by 1 CRC byte
+
+    returns -1 if all words are correct, else the index of the
+    first bad word. An incomplete trailing word counts as bad.
+    '''
+    if length is None:
+        length = len(data)
+    table = CRC8_TABLE
+    end = length - length % 3
+    for i in range(0, end, 3):
+        if table[table[CRC8_INIT ^ data[i]] ^ data[i + 1]] != data[i + 2]:
+            return i // 3
+    if end != length:
+        return end // 3
+    return -1
+
+
+def chk_crc(data):
+    '''
+    Checks if crc of data is correct
+    two data bytes are followed by 1 CRC byte
+    '''
+    return check_words(data) < 0